@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+USER_CACHE_TIME = 300
+
+
+def user_cache_key(user_id):
+    return 'auth:user:{}'.format(user_id)
+
+
+def forget_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который отдаёт пользователя сессии из кэша.
+
+    Запись сбрасывается сигналами при сохранении и удалении User;
+    массовые update() должны вызывать forget_user сами.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, getattr(
+                settings, 'AUTH_USER_CACHE_TIME', USER_CACHE_TIME))
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,132 @@
+import os
+import threading
+from contextlib import contextmanager
+
+from django.core.cache.backends import filebased, locmem, memcached
+from django.core.files import locks
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+from sorl.thumbnail import base as thumbnail_base
+
+from .instrumentation import timed
+from .metrics import count_cache
+
+_missing = object()
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return super().render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Шаблонизатор Django с замером времени рендера."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+class TimedCacheMixin:
+    """Замеряет обращения к кэшу и считает попадания и промахи."""
+
+    _local = threading.local()
+
+    def get(self, key, default=None, version=None):
+        with timed('cache'):
+            value = super().get(key, _missing, version)
+        if not getattr(self._local, 'in_get_many', False):
+            count_cache(key, value is not _missing)
+        return default if value is _missing else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        # Базовый get_many вызывает get() для каждого ключа,
+        # поэтому счётчики ведутся здесь, а не в get().
+        self._local.in_get_many = True
+        try:
+            with timed('cache'):
+                found = super().get_many(keys, version)
+        finally:
+            self._local.in_get_many = False
+        for key in keys:
+            count_cache(key, key in found)
+        return found
+
+    def set(self, *args, **kwargs):
+        with timed('cache'):
+            return super().set(*args, **kwargs)
+
+    def set_many(self, *args, **kwargs):
+        with timed('cache'):
+            return super().set_many(*args, **kwargs)
+
+    def add(self, *args, **kwargs):
+        with timed('cache'):
+            return super().add(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with timed('cache'):
+            return super().delete(*args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        with timed('cache'):
+            return super().incr(*args, **kwargs)
+
+
+class LocMemCache(TimedCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(TimedCacheMixin, filebased.FileBasedCache):
+    """Кэш в файлах, общий для всех процессов машины.
+
+    add и incr выполняются под файловой блокировкой, поэтому счётчики
+    не теряют прибавлений из соседних воркеров. Каталог при записи
+    просматривается не каждый раз, а раз в cull_every записей.
+    """
+
+    cull_every = 100
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._writes = 0
+
+    @contextmanager
+    def _locked(self):
+        self._createdir()
+        with open(os.path.join(self._dir, 'cache.lock'), 'ab') as lock:
+            locks.lock(lock, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock)
+
+    def _cull(self):
+        self._writes += 1
+        if self._writes % self.cull_every == 1:
+            super()._cull()
+
+    def add(self, *args, **kwargs):
+        with self._locked():
+            return super().add(*args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        with self._locked():
+            return super().incr(*args, **kwargs)
+
+
+class MemcachedCache(TimedCacheMixin, memcached.MemcachedCache):
+    pass
+
+
+class ThumbnailBackend(thumbnail_base.ThumbnailBackend):
+    def get_thumbnail(self, *args, **kwargs):
+        with timed('thumbnail'):
+            return super().get_thumbnail(*args, **kwargs)
@@ -0,0 +1,18 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Warning, register
+
+LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """Тренды, лимиты и сессии требуют кэша, общего для воркеров."""
+    if not isinstance(caches['default'], LOCAL_CACHES):
+        return []
+    return [Warning(
+        'Кэш по умолчанию виден только своему процессу.',
+        hint='Настройте memcached или FileBasedCache в CACHES.',
+        id='core.W001',
+    )]
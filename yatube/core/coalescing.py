@@ -0,0 +1,104 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.http import HttpResponse
+
+POLL_SECONDS = 0.05
+
+
+class Flight:
+    """Запрос, который уже выполняется в этом процессе."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.snapshot = None
+
+
+_lock = threading.Lock()
+_flights = {}
+
+
+def snapshot(response):
+    """Ответ в виде, пригодном для раздачи другим запросам, или None,
+    если ответ нельзя делить: стриминг, куки, не 200."""
+    if (response.streaming or response.cookies
+            or response.status_code != 200):
+        return None
+    return response.content, response.status_code, list(response.items())
+
+
+def restore(data):
+    content, status, headers = data
+    response = HttpResponse(content, status=status)
+    for name, value in headers:
+        response[name] = value
+    response.coalesced = True
+    return response
+
+
+def on_coalesced(hook):
+    """Помечает view функцией hook(request, *args, **kwargs). Её
+    вызывают для запросов, получивших чужой ответ вместо вызова view:
+    например, чтобы всё равно посчитать просмотр."""
+    def decorator(view):
+        view.on_coalesced = hook
+        return view
+    return decorator
+
+
+def coalesce(key, compute, timeout, shared=False):
+    """Выполняет compute один раз на все одновременные запросы с key.
+
+    Остальные ждут до timeout секунд и получают копию ответа. С shared
+    то же делается между процессами: лидер берёт блокировку в кэше и
+    кладёт туда результат.
+    """
+    with _lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = Flight()
+    if not leader:
+        if flight.done.wait(timeout) and flight.snapshot is not None:
+            return restore(flight.snapshot)
+        return compute()
+    try:
+        if shared:
+            response = coalesce_shared(key, compute, timeout)
+        else:
+            response = compute()
+        flight.snapshot = snapshot(response)
+        return response
+    finally:
+        with _lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def coalesce_shared(key, compute, timeout):
+    lock_key = 'coalesce:lock:{}'.format(key)
+    result_key = 'coalesce:result:{}'.format(key)
+    if cache.add(lock_key, 1, timeout):
+        cache.delete(result_key)
+        try:
+            response = compute()
+            data = snapshot(response)
+            if data is not None:
+                cache.set(result_key, data, timeout)
+            return response
+        finally:
+            cache.delete(lock_key)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        data = cache.get(result_key)
+        if data is not None:
+            return restore(data)
+        if cache.get(lock_key) is None:
+            # Ведущий мог положить результат между двумя чтениями.
+            data = cache.get(result_key)
+            if data is not None:
+                return restore(data)
+            break
+        time.sleep(POLL_SECONDS)
+    return compute()
@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from .backends.sqlite3.base import DEFAULT_PRAGMAS, apply_pragmas
+
+SEED_ROWS = 10_000
+PROFILES = {
+    # Как было: журнал DELETE, synchronous=FULL и новое соединение
+    # на каждый запрос.
+    'default': {'pragmas': {}, 'persistent': False},
+    'production': {'pragmas': DEFAULT_PRAGMAS, 'persistent': True},
+}
+
+
+def connect(path, pragmas):
+    connection = sqlite3.connect(path, isolation_level=None)
+    apply_pragmas(connection, pragmas)
+    return connection
+
+
+def prepare(path, pragmas, rows=SEED_ROWS):
+    connection = connect(path, pragmas)
+    connection.execute(
+        'CREATE TABLE post (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+        'text TEXT NOT NULL, pub_date REAL NOT NULL)'
+    )
+    connection.execute('CREATE INDEX post_pub_date ON post (pub_date)')
+    connection.executemany(
+        'INSERT INTO post (text, pub_date) VALUES (?, ?)',
+        (('Пост %s' % i, i) for i in range(rows))
+    )
+    connection.close()
+
+
+def worker(path, pragmas, persistent, role, duration, results):
+    """Читатель листает ленту, писатель добавляет посты."""
+    reads = writes = errors = 0
+    rnd = random.Random(os.getpid())
+    connection = None
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        if connection is None:
+            connection = connect(path, pragmas)
+        try:
+            if role == 'read':
+                connection.execute(
+                    'SELECT id, text FROM post ORDER BY pub_date DESC '
+                    'LIMIT 10 OFFSET ?', (rnd.randrange(1000),)
+                ).fetchall()
+                reads += 1
+            else:
+                connection.execute('BEGIN IMMEDIATE')
+                connection.execute(
+                    'INSERT INTO post (text, pub_date) VALUES (?, ?)',
+                    ('Новый пост', time.time())
+                )
+                connection.execute('COMMIT')
+                writes += 1
+        except sqlite3.OperationalError:
+            errors += 1
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+        if not persistent:
+            connection.close()
+            connection = None
+    results.put((reads, writes, errors))
+
+
+def run_profile(name, readers=4, writers=2, duration=5.0):
+    profile = PROFILES[name]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        prepare(path, profile['pragmas'])
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(
+                path, profile['pragmas'], profile['persistent'],
+                role, duration, results,
+            ))
+            for role in ['read'] * readers + ['write'] * writers
+        ]
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    reads, writes, errors = (sum(column) for column in zip(*totals))
+    return {
+        'readers': readers,
+        'writers': writers,
+        'duration_s': duration,
+        'reads_per_s': round(reads / duration, 1),
+        'writes_per_s': round(writes / duration, 1),
+        'errors': errors,
+    }
@@ -0,0 +1,157 @@
+import threading
+import time
+from contextlib import contextmanager
+
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+PHASES = ('sql', 'template', 'cache', 'thumbnail')
+
+_local = threading.local()
+phase_observers = []
+
+
+class RequestTimer:
+    """Собственное (без вложенных фаз) время каждой фазы запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.counts = {}
+        self.stack = []
+
+    def add(self, phase, ms):
+        self.phases[phase] = self.phases.get(phase, 0.0) + ms
+        self.counts[phase] = self.counts.get(phase, 0) + 1
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+
+def start_request():
+    _local.timer = RequestTimer()
+    return _local.timer
+
+
+def finish_request():
+    timer = getattr(_local, 'timer', None)
+    _local.timer = None
+    return timer
+
+
+def current_timer():
+    return getattr(_local, 'timer', None)
+
+
+@contextmanager
+def timed(phase):
+    """Засекает фазу phase в текущем запросе.
+
+    Время вложенной фазы вычитается из внешней, поэтому SQL, выполненный
+    при рендере шаблона, не попадает в template дважды. Подписчики из
+    phase_observers получают полное время фазы и вне запросов.
+    """
+    timer = current_timer()
+    if timer is None and not phase_observers:
+        yield
+        return
+    started = time.perf_counter()
+    if timer is not None:
+        timer.stack.append(0.0)
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        if timer is not None:
+            nested = timer.stack.pop()
+            timer.add(phase, elapsed - nested)
+            if timer.stack:
+                timer.stack[-1] += elapsed
+        for observer in phase_observers:
+            observer(phase, elapsed)
+
+
+def sql_timer(execute, sql, params, many, context):
+    """Обёртка для connection.execute_wrapper."""
+    with timed('sql'):
+        return execute(sql, params, many, context)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                return
+        self.counts[-1] += 1
+
+    def as_dict(self):
+        labels = [str(bound) for bound in self.buckets] + ['+Inf']
+        return {
+            'count': self.count,
+            'sum_ms': round(self.sum, 3),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class ViewStats:
+    """Агрегированная статистика запросов по имени URL в процессе."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def observe(self, view_name, timer):
+        total = timer.total_ms()
+        with self.lock:
+            stats = self.views.setdefault(view_name, {
+                'total': Histogram(),
+                'phases': {phase: Histogram() for phase in PHASES},
+            })
+            stats['total'].observe(total)
+            for phase in PHASES:
+                stats['phases'][phase].observe(timer.phases.get(phase, 0.0))
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                name: {
+                    'total': stats['total'].as_dict(),
+                    'phases': {
+                        phase: histogram.as_dict()
+                        for phase, histogram in stats['phases'].items()
+                    },
+                }
+                for name, stats in self.views.items()
+            }
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+
+view_stats = ViewStats()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name
+
+
+def server_timing(timer):
+    """Значение заголовка Server-Timing."""
+    parts = [
+        '{};dur={:.1f};desc="{} calls"'.format(
+            phase, timer.phases[phase], timer.counts[phase])
+        for phase in PHASES if phase in timer.phases
+    ]
+    parts.append('total;dur={:.1f}'.format(timer.total_ms()))
+    return ', '.join(parts)
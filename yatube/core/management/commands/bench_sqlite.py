@@ -0,0 +1,30 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.db.benchmark import PROFILES, run_profile
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite при параллельных '
+        'чтениях и записях до и после продакшен-настроек'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=5.0,
+                            help='Секунд на каждый профиль')
+        parser.add_argument('--profiles', nargs='+', choices=PROFILES,
+                            default=list(PROFILES))
+
+    def handle(self, *args, **options):
+        report = {
+            name: run_profile(
+                name, options['readers'], options['writers'],
+                options['duration']
+            )
+            for name in options['profiles']
+        }
+        self.stdout.write(json.dumps(report, indent=2))
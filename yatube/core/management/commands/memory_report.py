@@ -0,0 +1,31 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.memory import THREADS_NOTE, load, summarize
+
+
+class Command(BaseCommand):
+    help = 'Сводка по памяти вьюх из лога MEMORY_PROFILING_LOG'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=getattr(
+            settings, 'MEMORY_PROFILING_LOG', None))
+        parser.add_argument('--window', type=int, default=None,
+                            help='Учитывать последние N секунд')
+        parser.add_argument('--top', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if not options['log']:
+            raise CommandError('Не задан MEMORY_PROFILING_LOG или --log')
+        report = summarize(
+            load(options['log'], options['window']), options['top']
+        )
+        self.stdout.write(json.dumps(
+            dict(sorted(report.items(),
+                        key=lambda item: -item[1]['peak_max_kb'])),
+            ensure_ascii=False, indent=2
+        ))
+        # В stderr, чтобы stdout оставался JSON.
+        self.stderr.write(THREADS_NOTE)
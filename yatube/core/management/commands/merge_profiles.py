@@ -0,0 +1,56 @@
+import glob
+import io
+import os
+import pstats
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import merge_folded, view_dir
+
+
+class Command(BaseCommand):
+    help = (
+        'Склеивает профили из PROFILING_DIR: collapsed stacks для '
+        'flamegraph.pl/speedscope или сводку pstats'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--view', help='Имя URL, например posts:index')
+        parser.add_argument('--format', choices=('collapsed', 'pstats'),
+                            default='collapsed')
+        parser.add_argument('--output',
+                            help='Файл результата; для pstats - .prof')
+        parser.add_argument('--limit', type=int, default=30,
+                            help='Строк в текстовой сводке pstats')
+
+    def handle(self, *args, **options):
+        directory = (
+            view_dir(options['view']) if options['view']
+            else os.path.join(settings.PROFILING_DIR, '*')
+        )
+        if options['format'] == 'collapsed':
+            paths = glob.glob(os.path.join(directory, '*.folded'))
+        else:
+            paths = glob.glob(os.path.join(directory, '*.prof'))
+        if not paths:
+            raise CommandError('Профили не найдены в {}'.format(directory))
+        if options['format'] == 'pstats':
+            report = io.StringIO()
+            stats = pstats.Stats(*paths, stream=report)
+            if options['output']:
+                stats.dump_stats(options['output'])
+            else:
+                stats.sort_stats('cumulative').print_stats(options['limit'])
+                self.stdout.write(report.getvalue())
+            return
+        lines = [
+            '{} {}\n'.format(stack, count)
+            for stack, count in sorted(merge_folded(paths).items())
+        ]
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,46 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import metrics
+from core.models import Task
+from core.tasks import run_pending, start_periodic
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить готовые задачи и выйти')
+        parser.add_argument('--batch', type=int, default=10)
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help='Пауза при пустой очереди, секунды')
+        parser.add_argument('--purge-days', type=int, default=7,
+                            help='Удалять выполненные задачи старше N дней')
+
+    def handle(self, *args, **options):
+        self.purge(options['purge_days'])
+        start_periodic()
+        try:
+            self.loop(options)
+        finally:
+            # Без этого метрики воркера не попадут в /metrics.
+            metrics.maybe_flush(force=True)
+
+    def loop(self, options):
+        while True:
+            done = run_pending(options['batch'])
+            metrics.maybe_flush()
+            if done:
+                self.stdout.write('Выполнено задач: {}'.format(done))
+            elif options['once']:
+                return
+            else:
+                time.sleep(options['sleep'])
+
+    def purge(self, days):
+        border = timezone.now() - timedelta(days=days)
+        Task.objects.filter(status=Task.DONE, updated__lt=border).delete()
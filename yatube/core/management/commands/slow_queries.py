@@ -0,0 +1,47 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.slow_queries import summarize
+
+
+class Command(BaseCommand):
+    help = 'Показывает самые тяжёлые запросы из лога медленных запросов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=getattr(
+            settings, 'SLOW_QUERY_LOG', None))
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--order', default='total_ms',
+                            choices=('total_ms', 'max_ms', 'avg_ms', 'count'))
+        parser.add_argument('--json', action='store_true',
+                            help='Вывести результат в JSON')
+
+    def handle(self, *args, **options):
+        if not options['log']:
+            raise CommandError('Не задан SLOW_QUERY_LOG или --log')
+        try:
+            with open(options['log'], encoding='utf-8') as log:
+                entries = [json.loads(line) for line in log if line.strip()]
+        except FileNotFoundError:
+            raise CommandError('Лог {} не найден'.format(options['log']))
+        groups = summarize(entries, options['order'])[:options['limit']]
+        if options['json']:
+            self.stdout.write(json.dumps(groups, ensure_ascii=False,
+                                         indent=2))
+            return
+        for group in groups:
+            self.stdout.write(
+                '{count} раз, всего {total_ms:.1f} мс, макс {max_ms:.1f} мс, '
+                'в среднем {avg_ms:.1f} мс'.format(**group)
+            )
+            self.stdout.write('  вьюхи: {}'.format(', '.join(
+                '{} ({})'.format(view, count)
+                for view, count in sorted(
+                    group['views'].items(), key=lambda item: -item[1])
+            )))
+            self.stdout.write('  ' + group['example'])
+            for row in group['plan'] or []:
+                self.stdout.write('    ' + row)
+            self.stdout.write('')
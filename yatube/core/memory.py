@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+from django.conf import settings
+
+MEMORY_HEADER = 'HTTP_X_PROFILE_MEMORY'
+TOP_SITES = 10
+TRACE_FRAMES = 1
+THREADS_NOTE = (
+    'Пик и места аллокаций включают память, выделенную другими '
+    'потоками процесса во время запроса.'
+)
+IGNORED_FILES = (tracemalloc.__file__, '<frozen importlib._bootstrap>')
+
+_lock = threading.Lock()
+
+
+class MemoryTrace:
+    """Трассировка аллокаций одного запроса.
+
+    tracemalloc общий для процесса, поэтому одновременно
+    трассируется только один запрос, остальные пропускаются.
+    Фильтры tracemalloc не различают потоки: в пик и места аллокаций
+    попадает и то, что параллельно выделили другие потоки процесса.
+    """
+
+    def __init__(self):
+        self.started = False
+
+    def start(self):
+        if tracemalloc.is_tracing() or not _lock.acquire(blocking=False):
+            return False
+        tracemalloc.start(TRACE_FRAMES)
+        self.started = True
+        return True
+
+    def stop(self):
+        """Пик памяти за запрос и места, где выделена оставшаяся память."""
+        peak = tracemalloc.get_traced_memory()[1]
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        _lock.release()
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, name) for name in IGNORED_FILES
+        ])
+        sites = [
+            {
+                'site': '{}:{}'.format(
+                    stat.traceback[0].filename, stat.traceback[0].lineno),
+                'size': stat.size,
+                'count': stat.count,
+            }
+            for stat in snapshot.statistics('lineno')[:TOP_SITES]
+        ]
+        return peak, sites
+
+
+def record(view_name, peak, sites):
+    entry = {
+        'time': time.time(),
+        'view': view_name,
+        'peak': peak,
+        'retained': sum(site['size'] for site in sites),
+        'sites': sites,
+    }
+    path = getattr(settings, 'MEMORY_PROFILING_LOG', None)
+    if path:
+        with open(path, 'a', encoding='utf-8') as log:
+            log.write(json.dumps(entry) + '\n')
+    return entry
+
+
+def load(path, window=None):
+    """Записи лога за последние window секунд."""
+    if not path or not os.path.exists(path):
+        return []
+    border = time.time() - window if window else 0
+    with open(path, encoding='utf-8') as log:
+        entries = [json.loads(line) for line in log if line.strip()]
+    return [entry for entry in entries if entry['time'] >= border]
+
+
+def summarize(entries, top=TOP_SITES):
+    """Пик и главные места аллокаций по каждой вьюхе, в КБ."""
+    views = {}
+    for entry in entries:
+        view = views.setdefault(entry['view'], {
+            'samples': 0, 'peak_max': 0, 'peak_sum': 0,
+            'retained_sum': 0, 'sites': {},
+        })
+        view['samples'] += 1
+        view['peak_max'] = max(view['peak_max'], entry['peak'])
+        view['peak_sum'] += entry['peak']
+        view['retained_sum'] += entry['retained']
+        for site in entry['sites']:
+            view['sites'][site['site']] = (
+                view['sites'].get(site['site'], 0) + site['size']
+            )
+    report = {}
+    for name, view in views.items():
+        samples = view['samples']
+        sites = sorted(view['sites'].items(), key=lambda item: -item[1])
+        report[name] = {
+            'samples': samples,
+            'peak_max_kb': round(view['peak_max'] / 1024, 1),
+            'peak_avg_kb': round(view['peak_sum'] / samples / 1024, 1),
+            'retained_avg_kb': round(
+                view['retained_sum'] / samples / 1024, 1),
+            'top_sites': [
+                {'site': site, 'avg_kb': round(size / samples / 1024, 1)}
+                for site, size in sites[:top]
+            ],
+        }
+    return report
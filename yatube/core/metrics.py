@@ -0,0 +1,205 @@
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from .instrumentation import Histogram, phase_observers
+
+NAMESPACE = 'yatube'
+FLUSH_INTERVAL = 5
+METRICS = {
+    'request_duration_seconds': (
+        'histogram', 'Время обработки запроса по имени URL'),
+    'requests_total': (
+        'counter', 'Число запросов по имени URL и статусу'),
+    'cache_requests_total': (
+        'counter', 'Попадания и промахи кэша по префиксу ключа'),
+    'db_queries_total': (
+        'counter', 'Число SQL-запросов'),
+    'db_query_duration_seconds': (
+        'histogram', 'Время выполнения SQL-запроса'),
+    'thumbnail_duration_seconds': (
+        'histogram', 'Время подготовки превью картинки'),
+    'rate_limited_total': (
+        'counter', 'Запросы, отклонённые лимитом, по имени URL'),
+}
+CACHE_PAGE_PREFIXES = (
+    'views.decorators.cache.cache_page.',
+    'views.decorators.cache.cache_header.',
+)
+
+
+class Registry:
+    """Счётчики и гистограммы одного процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = 0.0
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, ms, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(ms)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [
+                    [name, dict(labels), value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                'histograms': [
+                    [name, dict(labels), list(histogram.buckets),
+                     list(histogram.counts), histogram.sum]
+                    for (name, labels), histogram
+                    in self.histograms.items()
+                ],
+            }
+
+    def flush(self, directory):
+        """Атомарно пишет снимок процесса в directory/<pid>.json."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, '{}.json'.format(os.getpid()))
+        temp = path + '.tmp'
+        with open(temp, 'w') as output:
+            json.dump(self.snapshot(), output)
+        os.replace(temp, path)
+        self.last_flush = time.monotonic()
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+registry = Registry()
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None)
+
+
+def maybe_flush(force=False):
+    directory = metrics_dir()
+    if directory and (
+        force or time.monotonic() - registry.last_flush > FLUSH_INTERVAL
+    ):
+        registry.flush(directory)
+
+
+def cache_prefix(key):
+    for prefix in CACHE_PAGE_PREFIXES:
+        if key.startswith(prefix):
+            return key[len(prefix):].split('.', 1)[0] or 'cache_page'
+    return key.split(':', 1)[0]
+
+
+def count_cache(key, hit):
+    registry.inc(
+        'cache_requests_total',
+        prefix=cache_prefix(key),
+        result='hit' if hit else 'miss'
+    )
+
+
+def observe_phase(phase, ms):
+    if phase == 'sql':
+        registry.inc('db_queries_total')
+        registry.observe('db_query_duration_seconds', ms)
+    elif phase == 'thumbnail':
+        registry.observe('thumbnail_duration_seconds', ms)
+
+
+phase_observers.append(observe_phase)
+
+
+def load_snapshots():
+    """Снимки всех процессов из METRICS_DIR или только текущего."""
+    directory = metrics_dir()
+    if not directory:
+        return [registry.snapshot()]
+    registry.flush(directory)
+    snapshots = []
+    for name in os.listdir(directory):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as source:
+                snapshots.append(json.load(source))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def merge(snapshots):
+    counters = {}
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(sorted(labels.items())))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, buckets, counts, total in snapshot['histograms']:
+            key = (name, tuple(sorted(labels.items())))
+            if key not in histograms:
+                histograms[key] = [buckets, [0] * len(counts), 0.0]
+            merged = histograms[key]
+            merged[1] = [a + b for a, b in zip(merged[1], counts)]
+            merged[2] += total
+    return counters, histograms
+
+
+def format_labels(labels, **extra):
+    pairs = list(labels) + sorted(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\')
+                         .replace('"', '\\"'))
+        for key, value in pairs
+    ) + '}'
+
+
+def render(counters, histograms):
+    """Текстовый формат экспозиции Prometheus."""
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        full_name = '{}_{}'.format(NAMESPACE, name)
+        lines.append('# HELP {} {}'.format(full_name, help_text))
+        lines.append('# TYPE {} {}'.format(full_name, kind))
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append('{}{} {}'.format(
+                        full_name, format_labels(labels), value))
+            continue
+        for (metric, labels), data in sorted(histograms.items()):
+            if metric != name:
+                continue
+            buckets, counts, total = data
+            cumulative = 0
+            bounds = ['{:g}'.format(bound / 1000) for bound in buckets]
+            for bound, count in zip(bounds + ['+Inf'], counts):
+                cumulative += count
+                lines.append('{}_bucket{} {}'.format(
+                    full_name, format_labels(labels, le=bound), cumulative))
+            lines.append('{}_sum{} {}'.format(
+                full_name, format_labels(labels), round(total / 1000, 6)))
+            lines.append('{}_count{} {}'.format(
+                full_name, format_labels(labels), cumulative))
+    return '\n'.join(lines) + '\n'
+
+
+def exposition():
+    return render(*merge(load_snapshots()))
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+from .. import coalescing
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class CoalescingMiddleware:
+    """Склеивает одновременные одинаковые анонимные GET-запросы к
+    COALESCE_VIEWS: страницу считает один запрос, остальные получают
+    его ответ."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        match = self.eligible(request)
+        if match is None:
+            return self.get_response(request)
+        key = '{}:{}'.format(request.method, request.get_full_path())
+        response = coalescing.coalesce(
+            key,
+            lambda: self.get_response(request),
+            getattr(settings, 'COALESCE_TIMEOUT', 5),
+            shared=getattr(settings, 'COALESCE_ACROSS_WORKERS', False),
+        )
+        hook = getattr(match.func, 'on_coalesced', None)
+        if hook is not None and getattr(response, 'coalesced', False):
+            hook(request, *match.args, **match.kwargs)
+        return response
+
+    def eligible(self, request):
+        """Совпадение URL, если запрос можно склеить, иначе None."""
+        # Сессионная кука - признак возможного входа: такие запросы
+        # не склеиваем, чтобы не отдать чужую страницу.
+        if (request.method not in SAFE_METHODS
+                or settings.SESSION_COOKIE_NAME in request.COOKIES):
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        if match.view_name in getattr(settings, 'COALESCE_VIEWS', ()):
+            return match
+        return None
@@ -0,0 +1,28 @@
+from django.conf import settings
+
+from ..instrumentation import view_name
+from ..memory import MEMORY_HEADER, MemoryTrace, record
+from ..profiling import should_sample
+
+
+class MemoryProfilingMiddleware:
+    """Снимает пик памяти и места аллокаций для каждого
+    MEMORY_PROFILING_SAMPLE_RATE-го запроса или по заголовку
+    X-Profile-Memory от сотрудника."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = getattr(settings, 'MEMORY_PROFILING_SAMPLE_RATE', 0)
+        if not should_sample(request, rate, MEMORY_HEADER):
+            return self.get_response(request)
+        trace = MemoryTrace()
+        if not trace.start():
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            peak, sites = trace.stop()
+        record(view_name(request), peak, sites)
+        return response
@@ -0,0 +1,26 @@
+from django.conf import settings
+
+from ..instrumentation import view_name
+from ..profiling import PROFILERS, profile_path, should_sample
+
+
+class ProfilingMiddleware:
+    """Профилирует каждый PROFILING_SAMPLE_RATE-й запрос или запросы
+    сотрудников с заголовком X-Profile и сохраняет профиль по вьюхам."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        if not should_sample(request, rate):
+            return self.get_response(request)
+        profiler_class, extension = PROFILERS[settings.PROFILING_MODE]
+        profiler = profiler_class()
+        profiler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        profiler.dump(profile_path(view_name(request), extension))
+        return response
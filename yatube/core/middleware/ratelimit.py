@@ -0,0 +1,36 @@
+import math
+from http import HTTPStatus
+
+from django.http import HttpResponse
+
+from .. import ratelimit
+from ..metrics import registry
+
+
+class RateLimitMiddleware:
+    """Отвечает 429 на запись сверх лимита view.
+
+    Стоит перед CsrfViewMiddleware: тот читает request.POST, а
+    отклонять спам нужно до разбора формы и загруженных картинок.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        wait = ratelimit.check(request, view_func)
+        if not wait:
+            return None
+        registry.inc(
+            'rate_limited_total', view=request.resolver_match.view_name
+        )
+        response = HttpResponse(
+            'Слишком много запросов, попробуйте позже',
+            status=HTTPStatus.TOO_MANY_REQUESTS,
+            content_type='text/plain; charset=utf-8'
+        )
+        response['Retry-After'] = str(math.ceil(wait))
+        return response
@@ -0,0 +1,36 @@
+from django.conf import settings
+
+from .. import routers
+
+PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class ReplicaRoutingMiddleware:
+    """Разрешает чтение с реплик для REPLICA_READ_VIEWS и закрепляет
+    пользователя за основной базой на REPLICA_PIN_SECONDS после записи,
+    чтобы он сразу видел свои изменения."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset()
+        pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+        if request.get_signed_cookie(PIN_COOKIE, None, max_age=pin_seconds):
+            routers.pin_to_primary()
+        try:
+            response = self.get_response(request)
+            if routers.wrote() or request.method not in SAFE_METHODS:
+                response.set_signed_cookie(
+                    PIN_COOKIE, '1', max_age=pin_seconds, httponly=True
+                )
+            return response
+        finally:
+            routers.reset()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        read_views = getattr(settings, 'REPLICA_READ_VIEWS', ())
+        if (request.method in SAFE_METHODS
+                and request.resolver_match.view_name in read_views):
+            routers.allow_replica_reads()
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.db import connections
+
+from .. import metrics
+from ..instrumentation import (finish_request, server_timing, sql_timer,
+                               start_request, view_name, view_stats)
+
+
+class ServerTimingMiddleware:
+    """Замеряет SQL, шаблоны, кэш и превью в каждом запросе.
+
+    Добавляет заголовок Server-Timing и копит гистограммы по имени URL.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = start_request()
+        wrappers = []
+        for connection in connections.all():
+            connection.execute_wrappers.append(sql_timer)
+            wrappers.append(connection)
+        try:
+            response = self.get_response(request)
+        finally:
+            for connection in wrappers:
+                connection.execute_wrappers.remove(sql_timer)
+            finish_request()
+        name = view_name(request)
+        view_stats.observe(name, timer)
+        metrics.registry.observe(
+            'request_duration_seconds', timer.total_ms(), view=name
+        )
+        metrics.registry.inc(
+            'requests_total', view=name, status=response.status_code
+        )
+        metrics.maybe_flush()
+        if getattr(settings, 'SERVER_TIMING_HEADER', True):
+            response['Server-Timing'] = server_timing(timer)
+        return response
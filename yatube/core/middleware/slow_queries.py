@@ -0,0 +1,27 @@
+from django.db import connections
+
+from ..slow_queries import set_view_name, slow_query_logger
+
+
+class SlowQueryMiddleware:
+    """Пишет в лог запросы к базе дольше SLOW_QUERY_THRESHOLD_MS
+    вместе с именем вьюхи и планом выполнения."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        set_view_name(None)
+        wrapped = []
+        for connection in connections.all():
+            connection.execute_wrappers.append(slow_query_logger)
+            wrapped.append(connection)
+        try:
+            return self.get_response(request)
+        finally:
+            for connection in wrapped:
+                connection.execute_wrappers.remove(slow_query_logger)
+            set_view_name(None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        set_view_name(request.resolver_match.view_name)
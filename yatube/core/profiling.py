@@ -0,0 +1,117 @@
+import cProfile
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+SAMPLING_INTERVAL = 0.005
+
+
+def should_sample(request, rate, header=PROFILE_HEADER):
+    """Профилировать ли запрос: каждый rate-й случайно или по заголовку
+    от сотрудника."""
+    if request.META.get(header):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            return True
+    return bool(rate) and random.randrange(rate) == 0
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return '{}:{}:{}'.format(
+        os.path.basename(code.co_filename), code.co_name, code.co_firstlineno
+    )
+
+
+def collapse(frame):
+    """Стек от корня к листу в формате collapsed stacks."""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    """Раз в interval снимает стек профилируемого потока из фонового."""
+
+    def __init__(self, interval=SAMPLING_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.thread_id = None
+        self.stopped = threading.Event()
+        self.sampler = None
+
+    def start(self):
+        self.thread_id = threading.get_ident()
+        self.sampler = threading.Thread(target=self.run, daemon=True)
+        self.sampler.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.sampler.join()
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as output:
+            for stack, count in self.stacks.items():
+                output.write('{} {}\n'.format(stack, count))
+
+
+class DeterministicProfiler:
+    """Обёртка над cProfile с тем же интерфейсом."""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+PROFILERS = {
+    'sampling': (SamplingProfiler, '.folded'),
+    'cprofile': (DeterministicProfiler, '.prof'),
+}
+
+
+def view_dir(view_name):
+    safe = re.sub(r'[^\w.-]', '_', view_name)
+    return os.path.join(settings.PROFILING_DIR, safe)
+
+
+def profile_path(view_name, extension):
+    directory = view_dir(view_name)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, '{}-{}-{}{}'.format(
+        time.strftime('%Y%m%d%H%M%S'), os.getpid(),
+        threading.get_ident(), extension
+    ))
+
+
+def merge_folded(paths):
+    stacks = Counter()
+    for path in paths:
+        with open(path, encoding='utf-8') as source:
+            for line in source:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack:
+                    stacks[stack] += int(count)
+    return stacks
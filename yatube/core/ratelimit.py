@@ -0,0 +1,88 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+UNITS = {'s': 1, 'm': 60, 'h': 3600}
+UNSAFE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+LOCK_TIMEOUT = 1
+LOCK_ATTEMPTS = 20
+LOCK_WAIT = 0.01
+
+
+def parse_rate(spec):
+    """'10/m' -> (ёмкость ведра, секунд на один токен)."""
+    count, unit = spec.split('/')
+    count = int(count)
+    return count, UNITS[unit] / count
+
+
+def rate_limit(user=None, ip=None, methods=UNSAFE_METHODS):
+    """Помечает view лимитами вида '10/m' на пользователя и на IP.
+
+    Проверяет их RateLimitMiddleware до CSRF и разбора тела запроса.
+    """
+    def decorator(view):
+        view.rate_limit = {'user': user, 'ip': ip, 'methods': methods}
+        return view
+    return decorator
+
+
+def take(key, spec, now=None):
+    """Берёт токен из ведра key. Возвращает 0 или сколько секунд
+    ждать следующего токена.
+
+    Чтение и запись ведра идут под блокировкой cache.add, иначе
+    одновременные запросы разных воркеров тратят один и тот же токен.
+    Не дождавшись блокировки, запрос отклоняется: за неё борются
+    только одновременные записи одного пользователя или IP.
+    """
+    capacity, interval = parse_rate(spec)
+    lock_key = key + ':lock'
+    for _ in range(LOCK_ATTEMPTS):
+        if cache.add(lock_key, 1, LOCK_TIMEOUT):
+            break
+        time.sleep(LOCK_WAIT)
+    else:
+        return LOCK_TIMEOUT
+    try:
+        now = time.time() if now is None else now
+        tokens, stamp = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - stamp) / interval)
+        if tokens < 1:
+            return (1 - tokens) * interval
+        cache.set(key, (tokens - 1, now), math.ceil(capacity * interval))
+        return 0
+    finally:
+        cache.delete(lock_key)
+
+
+def limits_for(view_name, view_func):
+    overrides = getattr(settings, 'RATE_LIMITS', {})
+    if view_name in overrides:
+        return dict(
+            {'methods': UNSAFE_METHODS}, **overrides[view_name]
+        )
+    return getattr(view_func, 'rate_limit', None)
+
+
+def check(request, view_func, now=None):
+    """Секунды до повтора, если запрос надо отклонить, иначе 0."""
+    view_name = request.resolver_match.view_name
+    limits = limits_for(view_name, view_func)
+    if not limits or request.method not in limits['methods']:
+        return 0
+    buckets = []
+    if limits.get('user') and request.user.is_authenticated:
+        buckets.append(('user:{}'.format(request.user.pk), limits['user']))
+    if limits.get('ip'):
+        buckets.append(
+            ('ip:{}'.format(request.META.get('REMOTE_ADDR')), limits['ip'])
+        )
+    for ident, spec in buckets:
+        key = 'ratelimit:{}:{}'.format(view_name, ident)
+        wait = take(key, spec, now)
+        if wait:
+            return wait
+    return 0
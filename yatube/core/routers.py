@@ -0,0 +1,51 @@
+import random
+import threading
+
+from django.conf import settings
+
+_local = threading.local()
+
+
+def reset():
+    _local.replica_reads = False
+    _local.pinned = False
+    _local.wrote = False
+
+
+def allow_replica_reads():
+    _local.replica_reads = True
+
+
+def pin_to_primary():
+    _local.pinned = True
+
+
+def wrote():
+    return getattr(_local, 'wrote', False)
+
+
+class PrimaryReplicaRouter:
+    """Чтения лент и страниц постов - с реплик, запись - в default.
+
+    Реплики используются только там, где их разрешил
+    ReplicaRoutingMiddleware; после записи в запросе и в течение
+    REPLICA_PIN_SECONDS после неё чтения идут в default.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if (replicas and getattr(_local, 'replica_reads', False)
+                and not getattr(_local, 'pinned', False)):
+            return random.choice(replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        _local.wrote = True
+        _local.pinned = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+}
+MAX_PLANNED = 1000
+MAX_PARAM_LENGTH = 200
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST_RE = re.compile(r'\bin \((?:\s*(?:%s|\?)\s*,?)+\)')
+SPACE_RE = re.compile(r'\s+')
+
+_local = threading.local()
+_planned = set()
+_lock = threading.Lock()
+
+
+def normalize(sql):
+    """SQL без литералов и с одинаковыми IN-списками любой длины."""
+    sql = SPACE_RE.sub(' ', sql.strip().lower())
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    return IN_LIST_RE.sub('in (...)', sql)
+
+
+def fingerprint(sql):
+    return hashlib.md5(normalize(sql).encode()).hexdigest()[:16]
+
+
+def threshold_ms():
+    return getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100)
+
+
+def set_view_name(name):
+    _local.view_name = name
+
+
+def explain(connection, sql, params):
+    prefix = EXPLAIN_PREFIXES.get(connection.vendor)
+    if prefix is None or not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    _local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [' '.join(map(str, row)) for row in cursor.fetchall()]
+    except Exception:
+        logger.exception('Не удалось получить план запроса')
+        return None
+    finally:
+        _local.explaining = False
+
+
+def format_params(params):
+    if params is None:
+        return None
+    return [repr(param)[:MAX_PARAM_LENGTH] for param in params]
+
+
+def record(connection, sql, params, duration):
+    key = fingerprint(sql)
+    plan = None
+    with _lock:
+        need_plan = key not in _planned and len(_planned) < MAX_PLANNED
+        if need_plan:
+            _planned.add(key)
+    if need_plan:
+        plan = explain(connection, sql, params)
+    entry = {
+        'time': timezone.now().isoformat(),
+        'fingerprint': key,
+        'view': getattr(_local, 'view_name', None),
+        'duration_ms': round(duration, 3),
+        'sql': sql,
+        'params': format_params(params),
+        'plan': plan,
+    }
+    logger.warning(
+        'Медленный запрос %.1f мс в %s: %s',
+        duration, entry['view'], sql
+    )
+    path = getattr(settings, 'SLOW_QUERY_LOG', None)
+    if path:
+        with _lock, open(path, 'a', encoding='utf-8') as log:
+            log.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    return entry
+
+
+def slow_query_logger(execute, sql, params, many, context):
+    """Обёртка для connection.execute_wrapper."""
+    if getattr(_local, 'explaining', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = (time.perf_counter() - started) * 1000
+    if duration >= threshold_ms() and not many:
+        record(context['connection'], sql, params, duration)
+    return result
+
+
+def summarize(entries, order='total_ms'):
+    """Группирует записи лога по отпечатку SQL."""
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(entry['fingerprint'], {
+            'fingerprint': entry['fingerprint'],
+            'sql': normalize(entry['sql']),
+            'example': entry['sql'],
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'views': {},
+            'plan': None,
+        })
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        if entry['duration_ms'] >= group['max_ms']:
+            group['max_ms'] = entry['duration_ms']
+            group['example'] = entry['sql']
+        view = entry.get('view') or '-'
+        group['views'][view] = group['views'].get(view, 0) + 1
+        if entry.get('plan'):
+            group['plan'] = entry['plan']
+    for group in groups.values():
+        group['avg_ms'] = group['total_ms'] / group['count']
+    return sorted(groups.values(), key=lambda group: -group[order])
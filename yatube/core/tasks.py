@@ -0,0 +1,173 @@
+import json
+import logging
+import time
+import traceback
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.core.mail import send_mail as django_send_mail
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY = 30
+LEASE_TIME = 300
+
+registry = {}
+startup = []
+
+
+def task(name):
+    """Регистрирует функцию как фоновую задачу с именем name."""
+    def decorator(func):
+        registry[name] = func
+        return func
+    return decorator
+
+
+def on_worker_start(func):
+    """Регистрирует функцию без аргументов, которую run_tasks вызывает
+    при запуске: так периодическая задача ставит первое звено цепочки."""
+    startup.append(func)
+    return func
+
+
+def start_periodic():
+    for func in startup:
+        func()
+
+
+def enqueue(name, payload=None, priority=0, key=None, delay=0,
+            max_attempts=3):
+    """Ставит задачу в очередь.
+
+    Повторный вызов с тем же key не создаёт новую задачу,
+    а возвращает уже существующую.
+    """
+    if name not in registry:
+        raise KeyError('Неизвестная задача: {}'.format(name))
+    if key is not None:
+        existing = Task.objects.filter(idempotency_key=key).first()
+        if existing is not None:
+            return existing
+    job = Task(
+        name=name,
+        payload=json.dumps(payload or {}),
+        priority=priority,
+        max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        idempotency_key=key,
+    )
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        return Task.objects.get(idempotency_key=key)
+    if getattr(settings, 'TASKS_ALWAYS_EAGER', False):
+        execute(job)
+    return job
+
+
+def claim(batch=10):
+    """Забирает из очереди готовые к выполнению задачи.
+
+    Задача с истёкшей арендой, уже исчерпавшая попытки, не берётся
+    снова, а помечается FAILED: иначе упавший на ней воркер повторял бы
+    её бесконечно.
+    """
+    now = timezone.now()
+    expired = Q(status=Task.RUNNING, locked_until__lt=now)
+    Task.objects.filter(
+        expired, attempts__gte=F('max_attempts')
+    ).update(
+        status=Task.FAILED,
+        locked_until=None,
+        last_error='Аренда истекла на последней попытке',
+        updated=now,
+    )
+    ready = Task.objects.filter(
+        Q(status=Task.QUEUED, run_at__lte=now)
+        | expired & Q(attempts__lt=F('max_attempts'))
+    ).values_list('pk', 'status')[:batch]
+    claimed = []
+    for pk, status in ready:
+        rows = Task.objects.filter(pk=pk, status=status)
+        if status == Task.RUNNING:
+            rows = rows.filter(attempts__lt=F('max_attempts'))
+        updated = rows.update(
+            status=Task.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=LEASE_TIME),
+        )
+        if updated:
+            claimed.append(pk)
+    return list(Task.objects.filter(pk__in=claimed))
+
+
+def execute(job):
+    """Выполняет задачу и записывает результат или планирует повтор."""
+    func = registry.get(job.name)
+    try:
+        if func is None:
+            raise KeyError('Неизвестная задача: {}'.format(job.name))
+        func(**json.loads(job.payload))
+    except Exception:
+        logger.exception('Задача %s #%s упала', job.name, job.pk)
+        attempts = job.attempts or 1
+        if attempts >= job.max_attempts:
+            job.status = Task.FAILED
+        else:
+            job.status = Task.QUEUED
+            job.run_at = timezone.now() + timedelta(
+                seconds=RETRY_DELAY * 2 ** (attempts - 1)
+            )
+        job.last_error = traceback.format_exc()
+    else:
+        job.status = Task.DONE
+        job.last_error = ''
+    job.locked_until = None
+    job.save(update_fields=[
+        'status', 'run_at', 'locked_until', 'last_error', 'updated'
+    ])
+    return job.status
+
+
+def run_pending(batch=10):
+    """Выполняет одну пачку задач, возвращает число выполненных."""
+    jobs = claim(batch)
+    for job in jobs:
+        execute(job)
+    return len(jobs)
+
+
+@task('core.send_mail')
+def send_mail(subject, message, recipient_list, from_email=None):
+    django_send_mail(subject, message, from_email, recipient_list)
+
+
+@on_worker_start
+def schedule_session_cleanup(delay=0):
+    """Ставит очистку сессий на интервал SESSION_CLEANUP_SECONDS;
+    ключ не даёт запланировать один интервал дважды."""
+    interval = getattr(settings, 'SESSION_CLEANUP_SECONDS', 24 * 3600)
+    period = int((time.time() + delay) // interval)
+    return enqueue(
+        'core.clear_sessions',
+        key='clear_sessions:{}'.format(period),
+        delay=delay,
+    )
+
+
+@task('core.clear_sessions')
+def clear_sessions():
+    """Удаляет истёкшие сессии и планирует следующую очистку."""
+    engine = import_module(settings.SESSION_ENGINE)
+    engine.SessionStore.clear_expired()
+    schedule_session_cleanup(
+        getattr(settings, 'SESSION_CLEANUP_SECONDS', 24 * 3600)
+    )
@@ -0,0 +1,593 @@
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.contrib.sessions.backends.cached_db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import checks, coalescing, metrics, slow_queries
+from . import ratelimit, routers
+from .backends import FileBasedCache
+from .db.benchmark import run_profile
+from .middleware.coalescing import CoalescingMiddleware
+from .middleware.replicas import PIN_COOKIE
+from .instrumentation import finish_request, start_request, timed, view_stats
+from .models import Task
+from posts.models import Comment, Post
+from posts.view_counts import view_counter
+from .tasks import clear_sessions, enqueue, run_pending, task
+
+User = get_user_model()
+
+calls = []
+
+
+@task('core.tests.record')
+def record(value, fail=False):
+    if fail:
+        raise ValueError(value)
+    calls.append(value)
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_tasks_run_by_priority(self):
+        """Задачи выполняются в порядке приоритета"""
+        enqueue('core.tests.record', {'value': 'low'})
+        enqueue('core.tests.record', {'value': 'high'}, priority=5)
+        self.assertEqual(run_pending(), 2)
+        self.assertEqual(calls, ['high', 'low'])
+        self.assertEqual(
+            Task.objects.filter(status=Task.DONE).count(), 2
+        )
+
+    def test_idempotency_key(self):
+        """Задача с тем же ключом не ставится повторно"""
+        first = enqueue('core.tests.record', {'value': 1}, key='once')
+        second = enqueue('core.tests.record', {'value': 2}, key='once')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_retry_then_fail(self):
+        """Упавшая задача повторяется и помечается ошибкой"""
+        job = enqueue(
+            'core.tests.record', {'value': 'x', 'fail': True},
+            max_attempts=2
+        )
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.QUEUED)
+        self.assertIn('ValueError', job.last_error)
+        Task.objects.filter(pk=job.pk).update(run_at=job.created)
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_expired_lease_on_last_attempt(self):
+        """Задача, чей воркер умер на последней попытке, не берётся
+        снова, а помечается ошибкой"""
+        past = timezone.now() - timedelta(seconds=1)
+        job = enqueue('core.tests.record', {'value': 'x'}, max_attempts=2)
+        retry = enqueue('core.tests.record', {'value': 'y'})
+        Task.objects.filter(pk=job.pk).update(
+            status=Task.RUNNING, attempts=2, locked_until=past
+        )
+        Task.objects.filter(pk=retry.pk).update(
+            status=Task.RUNNING, attempts=1, locked_until=past
+        )
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, ['y'])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Task.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNone(job.locked_until)
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    def test_eager_mode(self):
+        """В режиме EAGER задача выполняется сразу"""
+        enqueue('core.tests.record', {'value': 'now'})
+        self.assertEqual(calls, ['now'])
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        view_stats.reset()
+
+    def test_nested_phases_are_exclusive(self):
+        """Вложенная фаза не учитывается во внешней"""
+        timer = start_request()
+        with timed('template'):
+            with timed('sql'):
+                time.sleep(0.02)
+        finish_request()
+        self.assertGreaterEqual(timer.phases['sql'], 20)
+        self.assertLess(timer.phases['template'], 20)
+
+    def test_header_and_stats(self):
+        """Ответ содержит Server-Timing, статистика доступна персоналу"""
+        response = self.client.get(reverse('posts:index'))
+        header = response['Server-Timing']
+        for phase in ('sql;dur=', 'template;dur=', 'cache;dur=', 'total;'):
+            self.assertIn(phase, header)
+        url = reverse('core:server_stats')
+        self.assertEqual(self.client.get(url).status_code, HTTPStatus.FOUND)
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        client = Client()
+        client.force_login(staff)
+        stats = client.get(url).json()
+        self.assertEqual(stats['posts:index']['total']['count'], 1)
+        self.assertIn('sql', stats['posts:index']['phases'])
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+
+    def test_exposition(self):
+        """/metrics отдаёт задержки, кэш и SQL в формате Prometheus"""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        text = self.client.get('/metrics').content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            text
+        )
+        self.assertIn(
+            'yatube_cache_requests_total{prefix="index_page",result="hit"}',
+            text
+        )
+        self.assertIn(
+            'yatube_cache_requests_total{prefix="index_page",result="miss"}',
+            text
+        )
+        self.assertIn('# TYPE yatube_db_queries_total counter', text)
+        self.assertIn('yatube_db_query_duration_seconds_bucket{le="+Inf"}',
+                      text)
+
+    def test_processes_are_merged(self):
+        """Метрики других процессов суммируются через общую папку"""
+        with tempfile.TemporaryDirectory() as directory:
+            other = metrics.Registry()
+            other.inc('requests_total', 3, view='posts:index', status=200)
+            with open(os.path.join(directory, '1.json'), 'w') as output:
+                json.dump(other.snapshot(), output)
+            metrics.registry.inc(
+                'requests_total', 2, view='posts:index', status=200
+            )
+            with override_settings(METRICS_DIR=directory):
+                text = metrics.exposition()
+        self.assertIn(
+            'yatube_requests_total{status="200",view="posts:index"} 5',
+            text
+        )
+
+    def test_worker_flushes(self):
+        """run_tasks выгружает метрики воркера в общую папку"""
+        metrics.registry.observe('thumbnail_duration_seconds', 5)
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS_DIR=directory):
+                call_command('run_tasks', '--once', stdout=io.StringIO())
+            path = os.path.join(directory, '{}.json'.format(os.getpid()))
+            with open(path) as source:
+                snapshot = json.load(source)
+        self.assertIn('thumbnail_duration_seconds', json.dumps(snapshot))
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_allowed_ips(self):
+        """Метрики закрыты для чужих адресов"""
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+
+class SlowQueryTests(TestCase):
+    def test_normalize(self):
+        """Отпечаток не зависит от литералов и длины IN-списка"""
+        self.assertEqual(
+            slow_queries.fingerprint(
+                "SELECT * FROM t WHERE id IN (%s, %s) AND a = 'x' LIMIT 10"),
+            slow_queries.fingerprint(
+                "select * from t where id in (%s) and a = 'yy' limit 20"),
+        )
+
+    def test_log_and_summary(self):
+        """Медленные запросы пишутся в лог с вьюхой и планом"""
+        cache.clear()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'slow.jsonl')
+            with override_settings(SLOW_QUERY_THRESHOLD_MS=0,
+                                   SLOW_QUERY_LOG=path):
+                with self.assertLogs('core.slow_queries', 'WARNING'):
+                    self.client.get(reverse('posts:index'))
+            with open(path, encoding='utf-8') as log:
+                entries = [json.loads(line) for line in log]
+            self.assertTrue(entries)
+            self.assertEqual(entries[0]['view'], 'posts:index')
+            self.assertTrue(any(entry['plan'] for entry in entries))
+            out = io.StringIO()
+            call_command('slow_queries', '--log', path, stdout=out)
+        self.assertIn('posts:index', out.getvalue())
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = Client()
+        self.staff.force_login(
+            User.objects.create_user(username='staff', is_staff=True)
+        )
+
+    def profile_index(self, mode):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(PROFILING_DIR=directory, PROFILING_MODE=mode):
+            self.client.get(reverse('posts:index'), HTTP_X_PROFILE='1')
+            self.assertFalse(os.listdir(directory))
+            cache.clear()
+            self.staff.get(reverse('posts:index'), HTTP_X_PROFILE='1')
+            self.assertEqual(os.listdir(directory), ['posts_index'])
+            out = io.StringIO()
+            call_command(
+                'merge_profiles', '--view', 'posts:index',
+                '--format', 'collapsed' if mode == 'sampling' else 'pstats',
+                stdout=out
+            )
+        return out.getvalue()
+
+    def test_sampling_profile(self):
+        """Сэмплирующий профиль пишется только для сотрудников"""
+        self.profile_index('sampling')
+
+    def test_cprofile_profile(self):
+        """cProfile-профиль склеивается в сводку pstats"""
+        self.assertIn('function calls', self.profile_index('cprofile'))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sample_rate(self):
+        """При PROFILING_SAMPLE_RATE=1 профилируется каждый запрос"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(PROFILING_DIR=directory,
+                               PROFILING_MODE='cprofile'):
+            self.client.get(reverse('posts:index'))
+        self.assertEqual(os.listdir(directory), ['posts_index'])
+
+
+class MemoryProfilingTests(TestCase):
+    def test_memory_report(self):
+        """Пик памяти вьюхи пишется в лог и виден сотрудникам"""
+        staff = Client()
+        staff.force_login(
+            User.objects.create_user(username='staff', is_staff=True)
+        )
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'memory.jsonl')
+        with override_settings(MEMORY_PROFILING_LOG=path):
+            cache.clear()
+            staff.get(reverse('posts:index'), HTTP_X_PROFILE_MEMORY='1')
+            report = staff.get(reverse('core:memory_stats')).json()
+            out = io.StringIO()
+            err = io.StringIO()
+            call_command('memory_report', stdout=out, stderr=err)
+        self.assertEqual(report['posts:index']['samples'], 1)
+        self.assertGreater(report['posts:index']['peak_max_kb'], 0)
+        self.assertTrue(report['posts:index']['top_sites'])
+        self.assertIn('posts:index', json.loads(out.getvalue()))
+        self.assertIn('потоками', err.getvalue())
+
+
+class SqliteProfileTests(TestCase):
+    def test_pragmas_applied(self):
+        """Новое соединение получает PRAGMA из настроек"""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+        self.assertTrue(connection.is_usable())
+
+    def test_benchmark_profiles(self):
+        """Бенчмарк SQLite считает чтения и записи для обоих профилей"""
+        for name in ('default', 'production'):
+            with self.subTest(profile=name):
+                report = run_profile(name, readers=1, writers=1,
+                                     duration=0.2)
+                self.assertGreater(report['reads_per_s'], 0)
+                self.assertGreater(report['writes_per_s'], 0)
+
+
+class ReplicaRoutingTests(TestCase):
+    def tearDown(self):
+        routers.reset()
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_router(self):
+        """Чтение уходит в реплику только если разрешено и нет записи"""
+        router = routers.PrimaryReplicaRouter()
+        routers.reset()
+        self.assertEqual(router.db_for_read(Post), 'default')
+        routers.allow_replica_reads()
+        self.assertEqual(router.db_for_read(Post), 'replica')
+        self.assertEqual(router.db_for_write(Post), 'default')
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_pin_cookie_after_write(self):
+        """После записи пользователь закрепляется за основной базой"""
+        cache.clear()
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(author=author, text='Пост')
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.client.force_login(author)
+        response = self.client.post(
+            reverse('posts:add_comment', args=[post.pk]), {'text': 'Ок'}
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+
+class RateLimitTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='writer')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+
+    def test_token_bucket(self):
+        """Ведро отдаёт burst токенов и пополняется со временем"""
+        self.assertEqual(ratelimit.take('bucket', '2/m', now=0), 0)
+        self.assertEqual(ratelimit.take('bucket', '2/m', now=0), 0)
+        self.assertEqual(ratelimit.take('bucket', '2/m', now=0), 30)
+        self.assertAlmostEqual(ratelimit.take('bucket', '2/m', now=20), 10)
+        self.assertEqual(ratelimit.take('bucket', '2/m', now=30), 0)
+
+    def test_concurrent_takes(self):
+        """Одновременные запросы не тратят один токен дважды"""
+        results = []
+
+        def request():
+            results.append(ratelimit.take('bucket', '5/m', now=0))
+
+        threads = [threading.Thread(target=request) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results.count(0), 5)
+
+    @override_settings(RATE_LIMITS={'posts:add_comment': {'user': '2/m'}})
+    def test_rejected_before_csrf(self):
+        """Лишняя запись получает 429 ещё до проверки CSRF"""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        url = reverse('posts:add_comment', args=[self.post.pk])
+        for _ in range(2):
+            response = client.post(url, {'text': 'Спам'})
+            self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        response = client.post(url, {'text': 'Спам'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertFalse(Comment.objects.exists())
+        self.assertIn(
+            'yatube_rate_limited_total{view="posts:add_comment"} 1',
+            metrics.exposition()
+        )
+
+    def test_view_defaults(self):
+        """Лимит из декоратора действует только на запись"""
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('posts:post_create')
+        for _ in range(12):
+            self.assertEqual(client.get(url).status_code, HTTPStatus.OK)
+        statuses = [
+            client.post(url, {'text': ''}).status_code for _ in range(11)
+        ]
+        self.assertEqual(statuses.count(HTTPStatus.TOO_MANY_REQUESTS), 1)
+
+
+class CoalescingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def run_concurrently(self, call):
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return HttpResponse('страница')
+
+        results = []
+
+        def request():
+            results.append(call(compute).content)
+
+        leader = threading.Thread(target=request)
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=request) for _ in range(5)]
+        for thread in followers:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+        return calls, results
+
+    def tearDown(self):
+        # Иначе буфер просмотров переживёт тестовую базу.
+        view_counter.pending.clear()
+
+    def test_coalesce_in_worker(self):
+        """Одновременные запросы ждут один расчёт и делят ответ"""
+        calls, results = self.run_concurrently(
+            lambda compute: coalescing.coalesce('page', compute, 5)
+        )
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['страница'.encode()] * 6)
+
+    def test_coalesce_across_workers(self):
+        """Блокировка в кэше склеивает запросы разных процессов"""
+        calls, results = self.run_concurrently(
+            lambda compute: coalescing.coalesce_shared('page', compute, 5)
+        )
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['страница'.encode()] * 6)
+
+    def test_followers_record_views(self):
+        """Просмотр засчитан и запросам, получившим чужой ответ"""
+        post = Post.objects.create(
+            author=User.objects.create_user(username='author'), text='Пост'
+        )
+        request = RequestFactory().get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        view_counter.pending.clear()
+
+        def call(compute):
+            def get_response(request):
+                view_counter.hit(post.pk)
+                return compute()
+            return CoalescingMiddleware(get_response)(request)
+
+        calls, results = self.run_concurrently(call)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 6)
+        self.assertEqual(view_counter.pending_for(post.pk), 6)
+        view_counter.pending.clear()
+
+    def test_unshareable_response(self):
+        """Ответ с куками не раздаётся другим запросам"""
+        response = HttpResponse('ok')
+        response.set_cookie('csrftoken', 'secret')
+        self.assertIsNone(coalescing.snapshot(response))
+        self.assertIsNotNone(coalescing.snapshot(HttpResponse('ok')))
+
+    def test_middleware_passes_through(self):
+        """Страницы по-прежнему отдаются анонимам и вошедшим"""
+        post = Post.objects.create(
+            author=User.objects.create_user(username='author'), text='Пост'
+        )
+        url = reverse('posts:post_detail', args=[post.pk])
+        self.assertContains(Client().get(url), 'Пост')
+        client = Client()
+        client.force_login(post.author)
+        self.assertContains(client.get(url), 'Пост')
+
+
+class AuthCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def auth_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [
+            query['sql'] for query in queries.captured_queries
+            if 'django_session' in query['sql']
+            or 'auth_user' in query['sql']
+        ]
+
+    def test_no_auth_queries(self):
+        """Повторный запрос берёт сессию и пользователя из кэша"""
+        url = reverse('about:author')
+        self.client.get(url)
+        response, queries = self.auth_queries(url)
+        self.assertTrue(response.wsgi_request.user.is_authenticated)
+        self.assertEqual(queries, [])
+
+    def test_user_invalidated(self):
+        """Сохранение пользователя сбрасывает его копию в кэше"""
+        url = reverse('about:author')
+        self.client.get(url)
+        self.user.username = 'renamed'
+        self.user.save()
+        response, _ = self.auth_queries(url)
+        self.assertEqual(response.wsgi_request.user.username, 'renamed')
+
+    def test_write_through(self):
+        """Изменения сессии сразу попадают в базу и переживают кэш"""
+        session = SessionStore()
+        session['value'] = 1
+        session.create()
+        session['value'] = 2
+        session.save()
+        row = Session.objects.get(session_key=session.session_key)
+        self.assertEqual(row.get_decoded()['value'], 2)
+        cache.clear()
+        self.assertEqual(SessionStore(session.session_key)['value'], 2)
+
+    def test_clear_sessions(self):
+        """Задача очистки удаляет истёкшие сессии"""
+        session = SessionStore()
+        session.set_expiry(-1)
+        session.create()
+        clear_sessions()
+        self.assertFalse(
+            Session.objects.filter(session_key=session.session_key).exists()
+        )
+
+
+def increment(directory, times):
+    shared = FileBasedCache(directory, {})
+    for _ in range(times):
+        shared.incr('counter')
+
+
+class SharedCacheTests(TestCase):
+    def test_incr_across_processes(self):
+        """Прибавления из разных процессов не теряются"""
+        with tempfile.TemporaryDirectory() as directory:
+            shared = FileBasedCache(directory, {})
+            shared.add('counter', 0)
+            workers = [
+                multiprocessing.Process(
+                    target=increment, args=(directory, 50)
+                )
+                for _ in range(4)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            self.assertEqual(shared.get('counter'), 200)
+
+    def test_local_cache_warning(self):
+        """Кэш отдельного процесса вызывает предупреждение check"""
+        self.assertEqual(checks.check_shared_cache(None), [])
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'core.backends.LocMemCache',
+        }}):
+            warnings = checks.check_shared_cache(None)
+        self.assertEqual([w.id for w in warnings], ['core.W001'])
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('', views.server_stats, name='server_stats'),
+    path('memory/', views.memory_stats, name='memory_stats'),
+]
@@ -1,7 +1,15 @@
 from http import HTTPStatus
 
+from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
 
+from .instrumentation import view_stats
+from .memory import load as load_memory_log
+from .memory import summarize as summarize_memory
+from .metrics import exposition
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html',
@@ -21,3 +29,30 @@ def server_error(request):
 def permission_denied(request, exception):
     return render(request, 'core/403.html',
                   status=HTTPStatus.FORBIDDEN)
+
+
+@staff_member_required
+def server_stats(request):
+    return JsonResponse(view_stats.as_dict())
+
+
+@staff_member_required
+def memory_stats(request):
+    try:
+        window = int(request.GET.get('window', 3600))
+    except ValueError:
+        window = 3600
+    entries = load_memory_log(
+        getattr(settings, 'MEMORY_PROFILING_LOG', None), window
+    )
+    return JsonResponse(summarize_memory(entries))
+
+
+def metrics(request):
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', None)
+    if allowed and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponse(status=HTTPStatus.FORBIDDEN)
+    return HttpResponse(
+        exposition(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
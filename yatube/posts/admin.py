@@ -1,9 +1,37 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
 
-from .models import Post, Group
+from .deletion import schedule_deletion
+from .models import Post, Group, Tag, User
 
 
-class PostAdmin(admin.ModelAdmin):
+class ScheduledDeletionMixin:
+    """Удаление из админки уходит в фон пачками."""
+
+    def get_deleted_objects(self, objs, request):
+        # Стандартная страница подтверждения собирает весь каскад
+        # через Collector - ровно то, чего фоновое удаление избегает.
+        objs = list(objs)
+        opts = self.model._meta
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(opts.verbose_name)
+        return (
+            [str(obj) for obj in objs],
+            {opts.verbose_name_plural: len(objs)},
+            perms_needed,
+            [],
+        )
+
+    def delete_model(self, request, obj):
+        schedule_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            schedule_deletion(obj)
+
+
+class PostAdmin(ScheduledDeletionMixin, admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     list_editable = ('group',)
     search_fields = ('text',)
@@ -11,5 +39,17 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class GroupAdmin(ScheduledDeletionMixin, admin.ModelAdmin):
+    pass
+
+
+class ScheduledDeletionUserAdmin(ScheduledDeletionMixin, UserAdmin):
+    pass
+
+
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Tag)
+# Импорт django.contrib.auth.admin выше уже зарегистрировал User.
+admin.site.unregister(User)
+admin.site.register(User, ScheduledDeletionUserAdmin)
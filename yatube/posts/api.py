@@ -0,0 +1,222 @@
+import base64
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_GET, require_POST
+
+from core.ratelimit import rate_limit
+
+from .deletion import hidden, visible
+from .follows import (follow, follower_counts, following_query, is_following,
+                      unfollow)
+from .models import ArchivedPost, Group, PendingDeletion, Post, User
+
+API_PAGE_SIZE = 20
+API_BATCH_LIMIT = 100
+API_CACHE_TIME = 300
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'image', 'author__username', 'group__slug'
+)
+
+
+def post_cache_key(post_id):
+    return 'api:post:{}'.format(post_id)
+
+
+def serialize(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'pub_date': row['pub_date'],
+        'author': row['author__username'],
+        'group': row['group__slug'],
+        'image': settings.MEDIA_URL + row['image'] if row['image'] else None,
+    }
+
+
+def encode_cursor(row, field='pub_date'):
+    raw = '{},{}'.format(row[field].isoformat(), row['id'])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        pub_date, pk = raw.rsplit(',', 1)
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (ValueError, UnicodeError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+def error(message, status):
+    return JsonResponse({'detail': message}, status=status)
+
+
+def feed_page(posts, position, size):
+    posts = visible(posts)
+    if position is not None:
+        pub_date, pk = position
+        posts = posts.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+        )
+    return list(
+        posts.order_by('-pub_date', '-id').values(*POST_FIELDS)[:size]
+    )
+
+
+def feed_response(request, posts, archived):
+    """Страница ленты по курсору (pub_date, id) вместо OFFSET.
+
+    Архивные посты старше любого горячего, поэтому archived читается,
+    только когда горячие строки кончились.
+    """
+    position = None
+    cursor = request.GET.get('cursor')
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            return error('Неверный курсор', HTTPStatus.BAD_REQUEST)
+    rows = feed_page(posts, position, API_PAGE_SIZE + 1)
+    if len(rows) <= API_PAGE_SIZE:
+        rows += feed_page(archived, position, API_PAGE_SIZE + 1 - len(rows))
+    next_cursor = None
+    if len(rows) > API_PAGE_SIZE:
+        rows = rows[:API_PAGE_SIZE]
+        next_cursor = encode_cursor(rows[-1])
+    return JsonResponse({
+        'results': [serialize(row) for row in rows],
+        'next': next_cursor,
+    })
+
+
+def get_posts(ids):
+    """Достаёт посты по id: сначала из кэша одним get_many,
+    недостающие одним запросом в базу, не найденные там - из архива."""
+    hidden_posts = hidden()[PendingDeletion.POST]
+    ids = [pk for pk in ids if pk not in hidden_posts]
+    keys = {post_cache_key(pk): pk for pk in ids}
+    found = {
+        keys[key]: value for key, value in cache.get_many(keys).items()
+    }
+    for model in (Post, ArchivedPost):
+        missing = [pk for pk in ids if pk not in found]
+        if not missing:
+            break
+        fresh = {
+            row['id']: serialize(row)
+            for row in visible(model.objects.filter(pk__in=missing))
+            .values(*POST_FIELDS)
+        }
+        cache.set_many(
+            {post_cache_key(pk): value for pk, value in fresh.items()},
+            API_CACHE_TIME
+        )
+        found.update(fresh)
+    return [found[pk] for pk in ids if pk in found]
+
+
+@require_GET
+def api_index(request):
+    return feed_response(
+        request, Post.objects.all(), ArchivedPost.objects.all()
+    )
+
+
+@require_GET
+def api_group(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    if group_id is None:
+        return error('Группа не найдена', HTTPStatus.NOT_FOUND)
+    return feed_response(
+        request,
+        Post.objects.filter(group_id=group_id),
+        ArchivedPost.objects.filter(group_id=group_id)
+    )
+
+
+@require_GET
+def api_profile(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if author_id is None:
+        return error('Пользователь не найден', HTTPStatus.NOT_FOUND)
+    return feed_response(
+        request,
+        Post.objects.filter(author_id=author_id),
+        ArchivedPost.objects.filter(author_id=author_id)
+    )
+
+
+@require_GET
+def api_follow(request):
+    if not request.user.is_authenticated:
+        return error('Требуется авторизация', HTTPStatus.UNAUTHORIZED)
+    authors = following_query(request.user)
+    return feed_response(
+        request,
+        Post.objects.filter(author_id__in=authors),
+        ArchivedPost.objects.filter(author_id__in=authors)
+    )
+
+
+@require_GET
+def api_post(request, post_id):
+    posts = get_posts([post_id])
+    if not posts:
+        return error('Пост не найден', HTTPStatus.NOT_FOUND)
+    return JsonResponse(posts[0])
+
+
+@require_GET
+def api_posts_batch(request):
+    try:
+        ids = [
+            int(pk) for pk in request.GET.get('ids', '').split(',') if pk
+        ]
+    except ValueError:
+        return error('ids должны быть числами', HTTPStatus.BAD_REQUEST)
+    if len(ids) > API_BATCH_LIMIT:
+        return error(
+            'Не больше {} id за запрос'.format(API_BATCH_LIMIT),
+            HTTPStatus.BAD_REQUEST
+        )
+    ids = list(dict.fromkeys(ids))
+    return JsonResponse({'results': get_posts(ids)})
+
+
+def follow_state(request, username, change):
+    """Подписка из JS: состояние кнопки и число подписчиков без
+    перерисовки профиля."""
+    if not request.user.is_authenticated:
+        return error('Требуется авторизация', HTTPStatus.UNAUTHORIZED)
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return error('Пользователь не найден', HTTPStatus.NOT_FOUND)
+    if author == request.user:
+        return error('Нельзя подписаться на себя', HTTPStatus.BAD_REQUEST)
+    change(request.user, author)
+    return JsonResponse({
+        'following': is_following(request.user, author),
+        'followers': follower_counts([author.pk])[author.pk],
+    })
+
+
+@rate_limit(user='60/m', ip='120/m')
+@require_POST
+def api_profile_follow(request, username):
+    return follow_state(request, username, follow)
+
+
+@rate_limit(user='60/m', ip='120/m')
+@require_POST
+def api_profile_unfollow(request, username):
+    return follow_state(request, username, unfollow)
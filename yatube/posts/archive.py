@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import changes
+from .models import (ArchivedComment, ArchivedPost, Comment, Post, Tag)
+
+ARCHIVE_BATCH = 500
+ARCHIVE_COUNT_TIME = 3600
+VERSION_KEY = 'archive:version'
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'author_id', 'group_id', 'image',
+    'comment_count', 'view_count',
+)
+COMMENT_FIELDS = ('id', 'post_id', 'author_id', 'text', 'created')
+
+
+def archive_version():
+    return cache.get_or_set(VERSION_KEY, 1, None)
+
+
+def bump_archive_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+
+
+class ArchiveFallbackList:
+    """Список для Paginator: сначала горячие посты, за ними архив.
+
+    Архив читается, только когда страница заходит за конец горячей
+    части. Число архивных постов по ключу key кэшируется до следующего
+    запуска archive_posts; key=None отключает кэширование.
+    """
+
+    def __init__(self, hot, archived, key):
+        self.hot = hot
+        self.archived = archived
+        self.key = key
+        self._hot_count = None
+
+    def hot_count(self):
+        if self._hot_count is None:
+            self._hot_count = self.hot.count()
+        return self._hot_count
+
+    def archived_count(self):
+        if self.key is None:
+            return self.archived.count()
+        key = 'archive:count:{}:{}'.format(archive_version(), self.key)
+        return cache.get_or_set(key, self.archived.count, ARCHIVE_COUNT_TIME)
+
+    def count(self):
+        return self.hot_count() + self.archived_count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        hot_count = self.hot_count()
+        items = []
+        if start < hot_count:
+            items.extend(self.hot[start:min(stop, hot_count)])
+        if stop > hot_count:
+            items.extend(
+                self.archived[max(start - hot_count, 0):stop - hot_count]
+            )
+        return items
+
+
+def archive_batch(border, batch=ARCHIVE_BATCH):
+    """Переносит в архив одну пачку постов старше border вместе
+    с комментариями. Возвращает число перенесённых постов."""
+    with transaction.atomic():
+        ids = list(
+            Post.objects.filter(pub_date__lt=border)
+            .order_by('pk').values_list('pk', flat=True)[:batch]
+        )
+        if not ids:
+            return 0
+        ArchivedPost.objects.bulk_create([
+            ArchivedPost(**row)
+            for row in Post.objects.filter(pk__in=ids).values(*POST_FIELDS)
+        ], ignore_conflicts=True)
+        comments = Comment.objects.filter(post_id__in=ids)
+        ArchivedComment.objects.bulk_create([
+            ArchivedComment(**row)
+            for row in comments.values(*COMMENT_FIELDS)
+        ], ignore_conflicts=True)
+        # Счётчик уже скопирован в архив: удаляем без сигналов,
+        # иначе каждый комментарий обновлял бы уходящий пост.
+        comments._raw_delete(comments.db)
+        Tag.posts.through.objects.filter(post_id__in=ids).delete()
+        Post.mentions.through.objects.filter(post_id__in=ids).delete()
+        Post.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def archive_older_than(days, batch=ARCHIVE_BATCH, log=None):
+    border = timezone.now() - timedelta(days=days)
+    total = 0
+    while True:
+        moved = archive_batch(border, batch)
+        if not moved:
+            break
+        total += moved
+        if log:
+            log('Перенесено в архив: {}'.format(total))
+    if total:
+        bump_archive_version()
+        changes.touch()
+    return total
@@ -0,0 +1,251 @@
+import json
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+
+from .comments import recount_comments
+from .importer import keep_dates
+from .models import Comment, Follow, Group, Post, User
+
+SIZES = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000,
+}
+BATCH = 10_000
+TEXT_POOL = 1000
+HOT_POSTS = 100_000
+ZIPF_S = 1.1
+FOLLOWS_PER_USER = 20
+MEMORY_SAMPLES = 5
+VIEWS = ('index', 'group_posts', 'profile', 'post_detail', 'follow_index')
+
+
+def zipf_weights(count, s=ZIPF_S):
+    """Накопленные веса для выбора с перекосом: первые - самые
+    популярные, как в реальном графе подписчиков."""
+    total = 0.0
+    weights = []
+    for rank in range(1, count + 1):
+        total += 1 / rank ** s
+        weights.append(total)
+    return weights
+
+
+def build_dataset(posts, users=None, groups=50, comments=None, seed=0,
+                  log=None):
+    """Заполняет базу синтетическими данными через bulk_create."""
+    fake = Faker('ru_RU')
+    Faker.seed(seed)
+    rnd = random.Random(seed)
+    users = users or max(posts // 50, 10)
+    comments = posts // 5 if comments is None else comments
+    texts = [fake.paragraph(nb_sentences=3) for _ in range(TEXT_POOL)]
+    password = make_password(None)
+
+    User.objects.bulk_create(
+        [User(username='bench_%s' % i, password=password)
+         for i in range(users)]
+    )
+    Group.objects.bulk_create([
+        Group(title=fake.sentence(nb_words=3), slug='bench-%s' % i,
+              description=fake.sentence())
+        for i in range(groups)
+    ])
+    user_ids = list(
+        User.objects.filter(username__startswith='bench_')
+        .order_by('pk').values_list('pk', flat=True)
+    )
+    group_ids = list(
+        Group.objects.filter(slug__startswith='bench-')
+        .values_list('pk', flat=True)
+    )
+    weights = zipf_weights(len(user_ids))
+    last_pk = Post.objects.order_by('-pk').values_list(
+        'pk', flat=True).first() or 0
+    start = timezone.now() - timedelta(days=365)
+    step = timedelta(days=365) / posts
+
+    with keep_dates():
+        for offset in range(0, posts, BATCH):
+            size = min(BATCH, posts - offset)
+            authors = rnd.choices(user_ids, cum_weights=weights, k=size)
+            with transaction.atomic():
+                Post.objects.bulk_create([
+                    Post(
+                        author_id=author,
+                        group_id=rnd.choice(group_ids + [None]),
+                        text=rnd.choice(texts),
+                        pub_date=start + step * (offset + i),
+                    )
+                    for i, author in enumerate(authors)
+                ])
+            if log:
+                log('posts: {}'.format(offset + size))
+
+        # Комментарии достаются в основном свежим постам: новые
+        # посты занимают первые ранги распределения Ципфа.
+        post_ids = list(
+            Post.objects.filter(pk__gt=last_pk).order_by('-pk')
+            .values_list('pk', flat=True)[:HOT_POSTS]
+        )
+        post_weights = zipf_weights(len(post_ids))
+        for offset in range(0, comments, BATCH):
+            size = min(BATCH, comments - offset)
+            targets = rnd.choices(
+                post_ids, cum_weights=post_weights, k=size
+            )
+            with transaction.atomic():
+                Comment.objects.bulk_create([
+                    Comment(
+                        post_id=target,
+                        author_id=rnd.choice(user_ids),
+                        text=rnd.choice(texts),
+                        created=timezone.now(),
+                    )
+                    for target in targets
+                ])
+        recount_comments(Post.objects.filter(pk__gt=last_pk))
+
+    follows = set()
+    for user in user_ids:
+        count = min(FOLLOWS_PER_USER, len(user_ids) - 1)
+        for author in rnd.choices(user_ids, cum_weights=weights, k=count):
+            if author != user:
+                follows.add((user, author))
+    Follow.objects.bulk_create(
+        [Follow(user_id=user, author_id=author) for user, author in follows]
+    )
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(share * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def view_urls(rnd, count):
+    """Набор URL для каждой вьюхи: случайные страницы и объекты,
+    плюс худший случай - самый популярный автор."""
+    pages = max(Post.objects.count() // 10, 1)
+    group_slugs = list(Group.objects.values_list('slug', flat=True))
+    top_authors = list(
+        User.objects.annotate(total=Count('posts'))
+        .order_by('-total').values_list('username', flat=True)[:10]
+    )
+    last_pk = Post.objects.order_by('-pk').values_list(
+        'pk', flat=True).first() or 0
+    first_pk = Post.objects.order_by('pk').values_list(
+        'pk', flat=True).first() or 0
+    return {
+        'index': [
+            reverse('posts:index') + '?page=%s' % rnd.randint(1, pages)
+            for _ in range(count)
+        ],
+        'group_posts': [
+            reverse('posts:group_list', args=[rnd.choice(group_slugs)])
+            for _ in range(count)
+        ],
+        'profile': [
+            reverse('posts:profile', args=[rnd.choice(top_authors)])
+            for _ in range(count)
+        ],
+        'post_detail': [
+            reverse('posts:post_detail',
+                    args=[rnd.randint(first_pk, last_pk)])
+            for _ in range(count)
+        ],
+        'follow_index': [reverse('posts:follow_index')] * count,
+    }
+
+
+def measure(client, urls, warm_cache=False):
+    latencies = []
+    queries = []
+    for url in urls:
+        if not warm_cache:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            client.get(url)
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+    peaks = []
+    tracemalloc.start()
+    try:
+        for url in urls[:MEMORY_SAMPLES]:
+            if not warm_cache:
+                cache.clear()
+            tracemalloc.reset_peak()
+            client.get(url)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+    return {
+        'requests': len(urls),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(statistics.mean(latencies), 3),
+        'queries': max(queries),
+        'peak_kb': round(max(peaks) / 1024, 1),
+    }
+
+
+def run_views(requests=100, views=VIEWS, warm_cache=False, seed=0):
+    """Гоняет вьюхи через тестовый клиент и собирает метрики."""
+    rnd = random.Random(seed)
+    client = Client()
+    reader = User.objects.annotate(total=Count('follower')).order_by(
+        '-total').first()
+    client.force_login(reader)
+    urls = view_urls(rnd, requests)
+    return {
+        'meta': {
+            'posts': Post.objects.count(),
+            'users': User.objects.count(),
+            'comments': Comment.objects.count(),
+            'follows': Follow.objects.count(),
+            'requests': requests,
+            'warm_cache': warm_cache,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+        },
+        'views': {
+            name: measure(client, urls[name], warm_cache) for name in views
+        },
+    }
+
+
+def compare(current, baseline):
+    """Изменение p50/p95/p99 в процентах относительно baseline."""
+    diff = {}
+    for name, stats in current['views'].items():
+        old = baseline.get('views', {}).get(name)
+        if not old:
+            continue
+        diff[name] = {
+            key: round((stats[key] - old[key]) / old[key] * 100, 1)
+            for key in ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'peak_kb')
+            if old.get(key)
+        }
+    return diff
+
+
+def dump(report):
+    return json.dumps(report, ensure_ascii=False, indent=2)
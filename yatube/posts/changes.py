@@ -0,0 +1,17 @@
+import time
+
+from django.core.cache import cache
+
+CHANGED_KEY = 'posts:changed'
+
+
+def touch():
+    """Отмечает, что набор постов изменился: новый пост, правка,
+    удаление или перенос в архив."""
+    cache.set(CHANGED_KEY, time.time(), None)
+
+
+def last_changed():
+    """Время последнего изменения постов. Если отметка вытеснена из
+    кэша, считаем, что посты изменились только что."""
+    return cache.get_or_set(CHANGED_KEY, time.time, None)
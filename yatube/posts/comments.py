@@ -0,0 +1,52 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .api import decode_cursor, encode_cursor
+from .models import Post
+
+COMMENTS_PAGE_SIZE = 50
+
+
+def comment_page(post, cursor=None, size=COMMENTS_PAGE_SIZE):
+    """Страница комментариев поста после cursor и курсор следующей."""
+    comments = post.comments.select_related('author').order_by(
+        'created', 'id'
+    )
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        created, pk = position
+        comments = comments.filter(
+            Q(created__gt=created) | Q(created=created, id__gt=pk)
+        )
+    comments = list(comments[:size + 1])
+    next_cursor = None
+    if len(comments) > size:
+        comments = comments[:size]
+        last = comments[-1]
+        next_cursor = encode_cursor(
+            {'created': last.created, 'id': last.pk}, 'created'
+        )
+    return comments, next_cursor
+
+
+def add_to_count(post_id, delta):
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(comment_count__gte=-delta)
+    posts.update(comment_count=F('comment_count') + delta)
+
+
+def recount_comments(posts=None):
+    """Пересчитывает сохранённое число комментариев, например после
+    bulk_create, который не отправляет сигналы. Подходит и для
+    архивных постов."""
+    if posts is None:
+        posts = Post.objects.all()
+    comment_model = posts.model._meta.get_field('comments').related_model
+    counts = (
+        comment_model.objects.filter(post=OuterRef('pk'))
+        .values('post').annotate(total=Count('pk')).values('total')
+    )
+    posts.update(comment_count=Coalesce(
+        Subquery(counts, output_field=IntegerField()), 0
+    ))
@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+from core.auth import forget_user
+from core.tasks import enqueue
+
+from . import changes
+from .models import Group, PendingDeletion, Post, User
+
+HIDDEN_KEY = 'deletion:hidden'
+# Кэш у каждого процесса может быть свой, поэтому набор живёт недолго:
+# удаление, запланированное в другом процессе, видно не позже этого срока.
+HIDDEN_CACHE_TIME = 5
+KINDS = {
+    User: PendingDeletion.USER,
+    Post: PendingDeletion.POST,
+    Group: PendingDeletion.GROUP,
+}
+
+
+def hidden():
+    """id объектов, ожидающих удаления, по видам."""
+    def load():
+        ids = {kind: set() for kind, _ in PendingDeletion.KINDS}
+        rows = PendingDeletion.objects.values_list('kind', 'object_id')
+        for kind, object_id in rows:
+            ids[kind].add(object_id)
+        return ids
+    return cache.get_or_set(HIDDEN_KEY, load, HIDDEN_CACHE_TIME)
+
+
+def forget_hidden():
+    cache.delete(HIDDEN_KEY)
+
+
+def visible(posts):
+    """Убирает из ленты посты, которые удаляются вместе с автором или
+    сами по себе. Посты удаляемой группы остаются: purge_group только
+    отвязывает их. Без удалений запрос не меняется."""
+    ids = hidden()
+    if ids[PendingDeletion.USER]:
+        posts = posts.exclude(author_id__in=ids[PendingDeletion.USER])
+    if ids[PendingDeletion.POST]:
+        posts = posts.exclude(pk__in=ids[PendingDeletion.POST])
+    return posts
+
+
+def check_visible(obj):
+    """404 для объекта, который уже удаляется."""
+    if obj.pk in hidden()[KINDS[type(obj)]]:
+        raise Http404
+
+
+def check_post_visible(post):
+    ids = hidden()
+    if (post.pk in ids[PendingDeletion.POST]
+            or post.author_id in ids[PendingDeletion.USER]):
+        raise Http404
+
+
+def schedule_deletion(obj):
+    """Сразу скрывает объект и ставит его удаление в очередь задач."""
+    kind = KINDS[type(obj)]
+    with transaction.atomic():
+        pending, _ = PendingDeletion.objects.get_or_create(
+            kind=kind, object_id=obj.pk
+        )
+        if kind == PendingDeletion.USER:
+            User.objects.filter(pk=obj.pk).update(is_active=False)
+    if kind == PendingDeletion.USER:
+        forget_user(obj.pk)
+    forget_hidden()
+    changes.touch()
+    enqueue(
+        'posts.purge',
+        {'pending_id': pending.pk},
+        key='purge:{}:{}'.format(kind, obj.pk)
+    )
+    return pending
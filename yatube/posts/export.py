@@ -0,0 +1,88 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+
+EXPORT_CHUNK = 2000
+POST_FIELDS = ('id', 'pub_date', 'group__slug', 'text', 'image')
+COMMENT_FIELDS = ('id', 'post_id', 'created', 'text')
+CSV_COLUMNS = ('type', 'id', 'post_id', 'date', 'group', 'text', 'image')
+FORMATS = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def iter_values(queryset, fields, chunk=EXPORT_CHUNK):
+    """Отдаёт строки values() пачками по первичному ключу.
+
+    Между пачками курсор закрывается, поэтому в памяти и в блокировке
+    чтения никогда не держится больше одной пачки.
+    """
+    last_pk = 0
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values(*fields)[:chunk]
+        )
+        if not rows:
+            return
+        yield from rows
+        last_pk = rows[-1]['id']
+
+
+def iter_records(author):
+    """Посты и комментарии автора в едином формате записей,
+    включая перенесённые в архив."""
+    for model in (Post, ArchivedPost):
+        posts = model.objects.filter(author=author)
+        for row in iter_values(posts, POST_FIELDS):
+            yield {
+                'type': 'post',
+                'id': row['id'],
+                'date': row['pub_date'],
+                'group': row['group__slug'],
+                'text': row['text'],
+                'image': row['image'],
+            }
+    for model in (Comment, ArchivedComment):
+        comments = model.objects.filter(author=author)
+        for row in iter_values(comments, COMMENT_FIELDS):
+            yield {
+                'type': 'comment',
+                'id': row['id'],
+                'post_id': row['post_id'],
+                'date': row['created'],
+                'text': row['text'],
+            }
+
+
+def jsonl_lines(records):
+    for record in records:
+        yield json.dumps(
+            record, cls=DjangoJSONEncoder, ensure_ascii=False
+        ) + '\n'
+
+
+class Echo:
+    """Файлоподобный объект, который возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(records):
+    writer = csv.DictWriter(Echo(), fieldnames=CSV_COLUMNS)
+    yield writer.writeheader()
+    for record in records:
+        record['date'] = record['date'].isoformat()
+        yield writer.writerow(record)
+
+
+def export_lines(author, fmt):
+    if fmt == 'csv':
+        return csv_lines(iter_records(author))
+    return jsonl_lines(iter_records(author))
@@ -0,0 +1,130 @@
+from datetime import datetime, timezone
+
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse, reverse_lazy
+from django.utils.feedgenerator import Atom1Feed
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+
+from .changes import last_changed
+from .deletion import check_visible, visible
+from .models import Group, Post, User
+from .views import CACHE_TIME
+
+FEED_SIZE = 20
+
+
+class LatestPostsFeed(Feed):
+    title = 'Yatube: последние записи'
+    link = reverse_lazy('posts:index')
+    description = 'Последние обновления на сайте'
+
+    def items(self):
+        return visible(Post.objects.select_related('author'))[:FEED_SIZE]
+
+    def item_title(self, item):
+        return str(item)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=[item.pk])
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+
+class GroupPostsFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        group = get_object_or_404(Group, slug=slug)
+        check_visible(group)
+        return group
+
+    def title(self, obj):
+        return 'Yatube: {}'.format(obj.title)
+
+    def link(self, obj):
+        return reverse('posts:group_list', args=[obj.slug])
+
+    def description(self, obj):
+        return obj.description
+
+    def items(self, obj):
+        return visible(obj.posts.select_related('author'))[:FEED_SIZE]
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    def get_object(self, request, username):
+        author = get_object_or_404(User, username=username)
+        check_visible(author)
+        return author
+
+    def title(self, obj):
+        return 'Yatube: записи {}'.format(obj.username)
+
+    def link(self, obj):
+        return reverse('posts:profile', args=[obj.username])
+
+    def description(self, obj):
+        return 'Все посты пользователя {}'.format(obj.username)
+
+    def items(self, obj):
+        return visible(obj.posts.select_related('author'))[:FEED_SIZE]
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class GroupPostsAtomFeed(GroupPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return obj.description
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+def feed_etag(request, *args, **kwargs):
+    return '{:.6f}'.format(last_changed())
+
+
+def feed_last_modified(request, *args, **kwargs):
+    """Отметка меняется при любой правке и удалении поста, а не только
+    при новом посте, как Max(pub_date)."""
+    return datetime.fromtimestamp(last_changed(), timezone.utc)
+
+
+def cached_feed(feed):
+    """Кэширует ленту так же, как HTML-страницы, и отвечает 304,
+    если с прошлого запроса посты не менялись.
+
+    Отметка входит в ключ кэша: иначе после правки клиент получил бы
+    новый ETag вместе со старой лентой.
+    """
+    @condition(etag_func=feed_etag, last_modified_func=feed_last_modified)
+    def view(request, *args, **kwargs):
+        prefix = 'feeds:{}'.format(feed_etag(request))
+        return cache_page(CACHE_TIME, key_prefix=prefix)(feed)(
+            request, *args, **kwargs
+        )
+    return view
+
+
+index_rss = cached_feed(LatestPostsFeed())
+index_atom = cached_feed(LatestPostsAtomFeed())
+group_rss = cached_feed(GroupPostsFeed())
+group_atom = cached_feed(GroupPostsAtomFeed())
+author_rss = cached_feed(AuthorPostsFeed())
+author_atom = cached_feed(AuthorPostsAtomFeed())
@@ -0,0 +1,116 @@
+from array import array
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+
+from .models import Follow
+from .suggestions import mark_stale_later
+
+FOLLOW_CACHE_TIME = 3600
+
+
+def following_key(user_id):
+    return 'follow:following:{}'.format(user_id)
+
+
+def followers_key(author_id):
+    return 'follow:followers:{}'.format(author_id)
+
+
+def pack(ids):
+    return array('q', sorted(ids)).tobytes()
+
+
+def unpack(raw):
+    ids = array('q')
+    ids.frombytes(raw)
+    return frozenset(ids)
+
+
+def following_ids(user):
+    """id авторов, на которых подписан user. В кэше лежат упакованным
+    массивом int64, а не списком объектов."""
+    if not user.is_authenticated:
+        return frozenset()
+    key = following_key(user.pk)
+    raw = cache.get(key)
+    if raw is None:
+        raw = pack(
+            Follow.objects.filter(user=user).values_list(
+                'author_id', flat=True)
+        )
+        cache.set(key, raw, FOLLOW_CACHE_TIME)
+    return unpack(raw)
+
+
+def is_following(user, author):
+    return author.pk in following_ids(user)
+
+
+def following_query(user):
+    """Подзапрос id авторов user для фильтров лент: число подписок
+    не раздувает SQL параметрами, как передача готового множества."""
+    return Follow.objects.filter(user=user).values('author_id')
+
+
+def following_among(user, author_ids):
+    """Какие из author_ids читает user - без запроса на каждого автора."""
+    return following_ids(user).intersection(author_ids)
+
+
+def follower_counts(author_ids):
+    """Число подписчиков по id авторов: из кэша одним get_many,
+    недостающие одним агрегирующим запросом."""
+    keys = {followers_key(pk): pk for pk in author_ids}
+    counts = {
+        keys[key]: value for key, value in cache.get_many(keys).items()
+    }
+    missing = [pk for pk in author_ids if pk not in counts]
+    if missing:
+        fresh = dict.fromkeys(missing, 0)
+        fresh.update(
+            Follow.objects.filter(author_id__in=missing)
+            .values_list('author_id').annotate(total=Count('pk'))
+        )
+        cache.set_many(
+            {followers_key(pk): value for pk, value in fresh.items()},
+            FOLLOW_CACHE_TIME
+        )
+        counts.update(fresh)
+    return counts
+
+
+def forget(user_id, author_id, delta):
+    """Сбрасывает подписки user и сдвигает закэшированное число
+    подписчиков author, не пересчитывая его запросом."""
+    cache.delete(following_key(user_id))
+    try:
+        cache.incr(followers_key(author_id), delta)
+    except ValueError:
+        pass
+
+
+def follow(user, author):
+    """Подписывает user на author одним INSERT по уникальному индексу
+    (user, author). Решение принимает база, а не кэш: повторная
+    подписка с другого воркера упирается в индекс и ничего не меняет."""
+    if user == author:
+        return False
+    try:
+        with transaction.atomic():
+            Follow.objects.create(user=user, author=author)
+    except IntegrityError:
+        return False
+    forget(user.pk, author.pk, 1)
+    mark_stale_later(user)
+    return True
+
+
+def unfollow(user, author):
+    deleted, _ = Follow.objects.filter(user=user, author=author).delete()
+    if not deleted:
+        return False
+    forget(user.pk, author.pk, -1)
+    mark_stale_later(user)
+    return True
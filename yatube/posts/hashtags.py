@@ -0,0 +1,68 @@
+import re
+
+from .models import Post, Tag, User
+
+TAG_RE = re.compile(r'(?<![\w&#])#(\w{1,100})')
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.+-]{0,149}\w)')
+
+
+def extract_tags(text):
+    """Возвращает множество хэштегов из текста в нижнем регистре."""
+    return {name.lower() for name in TAG_RE.findall(text)}
+
+
+def extract_mentions(text):
+    """Возвращает множество упомянутых через @ имён пользователей."""
+    return set(MENTION_RE.findall(text))
+
+
+def index_post(post):
+    """Пересобирает индекс хэштегов и упоминаний для поста."""
+    names = extract_tags(post.text)
+    tags = []
+    if names:
+        Tag.objects.bulk_create(
+            [Tag(name=name) for name in names],
+            ignore_conflicts=True
+        )
+        tags = Tag.objects.filter(name__in=names)
+    post.tags.set(tags)
+    usernames = extract_mentions(post.text)
+    mentioned = []
+    if usernames:
+        mentioned = User.objects.filter(username__in=usernames)
+    post.mentions.set(mentioned)
+
+
+def index_posts(posts):
+    """Индексирует пачку новых постов несколькими bulk-вставками.
+
+    posts - словарь {pk: text}. Подходит только для постов, у которых
+    ещё нет связей с тегами и упоминаниями, например после bulk_create.
+    """
+    post_tags = {pk: extract_tags(text) for pk, text in posts.items()}
+    post_mentions = {pk: extract_mentions(text) for pk, text in posts.items()}
+    names = set().union(*post_tags.values())
+    if names:
+        Tag.objects.bulk_create(
+            [Tag(name=name) for name in names],
+            ignore_conflicts=True
+        )
+        tag_ids = dict(
+            Tag.objects.filter(name__in=names).values_list('name', 'pk')
+        )
+        Tag.posts.through.objects.bulk_create([
+            Tag.posts.through(tag_id=tag_ids[name], post_id=pk)
+            for pk, tags in post_tags.items() for name in tags
+        ], ignore_conflicts=True)
+    usernames = set().union(*post_mentions.values())
+    if usernames:
+        user_ids = dict(
+            User.objects.filter(username__in=usernames)
+            .values_list('username', 'pk')
+        )
+        Post.mentions.through.objects.bulk_create([
+            Post.mentions.through(user_id=user_ids[name], post_id=pk)
+            for pk, mentioned in post_mentions.items()
+            for name in mentioned if name in user_ids
+        ], ignore_conflicts=True)
@@ -0,0 +1,264 @@
+import json
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import changes
+from .comments import recount_comments
+from .follows import followers_key, following_key
+from .hashtags import index_posts
+from .models import Comment, Follow, Group, Post, User
+from .suggestions import mark_stale_many
+
+IMPORT_CHUNK = 5000
+
+
+@contextmanager
+def keep_dates():
+    """Отключает auto_now_add, чтобы сохранить даты из файла."""
+    fields = (
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    )
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def parse_date(value):
+    date = parse_datetime(value) if value else None
+    if date is None:
+        return timezone.now()
+    if timezone.is_naive(date):
+        return timezone.make_aware(date)
+    return date
+
+
+class IdMap:
+    """id поста из файла -> id в базе: два массива int64 вместо
+    словаря, около 16 байт на пост.
+
+    Выгрузка идёт по возрастанию id, поэтому массивы обычно уже
+    упорядочены; иначе они сортируются один раз перед поиском.
+    """
+
+    def __init__(self):
+        self.sources = array('q')
+        self.targets = array('q')
+        self.ordered = True
+
+    def __len__(self):
+        return len(self.sources)
+
+    def add(self, source, target):
+        if self.sources and source < self.sources[-1]:
+            self.ordered = False
+        self.sources.append(source)
+        self.targets.append(target)
+
+    def get(self, source):
+        if not self.ordered:
+            self.sort()
+        index = bisect_left(self.sources, source)
+        if index < len(self.sources) and self.sources[index] == source:
+            return self.targets[index]
+        return None
+
+    def sort(self):
+        order = sorted(range(len(self.sources)), key=self.sources.__getitem__)
+        self.sources = array('q', (self.sources[i] for i in order))
+        self.targets = array('q', (self.targets[i] for i in order))
+        self.ordered = True
+
+
+class Importer:
+    """Загружает JSON Lines пачками через bulk_create.
+
+    Формат записей совпадает с выгрузкой export_posts, плюс поле
+    author (или author по умолчанию) и записи type=follow.
+    bulk_create не вызывает post_save, поэтому индекс тегов
+    и упоминаний строится отдельно, по одной пачке за раз.
+    """
+
+    def __init__(self, chunk=IMPORT_CHUNK, default_author=None,
+                 create_users=False, keep_ids=False):
+        self.chunk = chunk
+        self.default_author = default_author
+        self.create_users = create_users
+        self.keep_ids = keep_ids
+        self.users = {}
+        self.groups = {}
+        self.post_ids = IdMap()
+        self.stats = Counter()
+
+    def run(self, lines):
+        records = (json.loads(line) for line in lines if line.strip())
+        with keep_dates():
+            while True:
+                chunk = list(islice(records, self.chunk))
+                if not chunk:
+                    return self.stats
+                with transaction.atomic():
+                    self.load_chunk(chunk)
+
+    def load_chunk(self, records):
+        by_type = {'post': [], 'comment': [], 'follow': []}
+        for record in records:
+            if record.get('type') not in by_type:
+                self.stats['skipped'] += 1
+                continue
+            by_type[record['type']].append(record)
+        names = {self.default_author}
+        for record in records:
+            names.add(record.get('author'))
+            names.add(record.get('user'))
+        names.discard(None)
+        self.resolve_users(names)
+        self.resolve_groups({
+            record['group'] for record in by_type['post']
+            if record.get('group')
+        })
+        self.load_posts(by_type['post'])
+        self.load_comments(by_type['comment'])
+        self.load_follows(by_type['follow'])
+
+    def author_id(self, record):
+        return self.users.get(record.get('author') or self.default_author)
+
+    def resolve_users(self, names):
+        unknown = names - self.users.keys()
+        if not unknown:
+            return
+        self.users.update(
+            User.objects.filter(username__in=unknown)
+            .values_list('username', 'pk')
+        )
+        missing = unknown - self.users.keys()
+        if missing and self.create_users:
+            password = make_password(None)
+            User.objects.bulk_create([
+                User(username=name, password=password) for name in missing
+            ])
+            self.stats['user'] += len(missing)
+            self.users.update(
+                User.objects.filter(username__in=missing)
+                .values_list('username', 'pk')
+            )
+
+    def resolve_groups(self, slugs):
+        unknown = slugs - self.groups.keys()
+        if unknown:
+            self.groups.update(
+                Group.objects.filter(slug__in=unknown)
+                .values_list('slug', 'pk')
+            )
+
+    def load_posts(self, records):
+        if self.keep_ids and any(
+                record.get('id') is None for record in records):
+            # Без id строка получила бы автоинкремент, и сверка новых
+            # id по pk__gt перепутала бы посты.
+            raise ValueError('С --keep-ids id нужен у каждого поста')
+        posts = []
+        sources = []
+        for record in records:
+            author_id = self.author_id(record)
+            if author_id is None:
+                self.stats['skipped'] += 1
+                continue
+            posts.append(Post(
+                id=record['id'] if self.keep_ids else None,
+                author_id=author_id,
+                group_id=self.groups.get(record.get('group')),
+                text=record.get('text', ''),
+                image=record.get('image') or '',
+                pub_date=parse_date(record.get('date')),
+            ))
+            sources.append(record.get('id'))
+        if not posts:
+            return
+        last_pk = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+        Post.objects.bulk_create(posts)
+        if any(post.pk is None for post in posts):
+            # SQLite не возвращает id после bulk_create, но в транзакции
+            # новые строки получают подряд идущие id в порядке вставки.
+            new_pks = list(
+                Post.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', flat=True)
+            )
+            for post, pk in zip(posts, new_pks):
+                post.pk = pk
+        if not self.keep_ids:
+            for post, source_id in zip(posts, sources):
+                if isinstance(source_id, int):
+                    self.post_ids.add(source_id, post.pk)
+        index_posts({post.pk: post.text for post in posts})
+        changes.touch()
+        self.stats['post'] += len(posts)
+
+    def load_comments(self, records):
+        comments = []
+        for record in records:
+            author_id = self.author_id(record)
+            post_id = record.get('post_id')
+            if not self.keep_ids:
+                post_id = (
+                    self.post_ids.get(post_id)
+                    if isinstance(post_id, int) else None
+                )
+            if author_id is None or post_id is None:
+                self.stats['skipped'] += 1
+                continue
+            comments.append(Comment(
+                post_id=post_id,
+                author_id=author_id,
+                text=record.get('text', ''),
+                created=parse_date(record.get('date')),
+            ))
+        Comment.objects.bulk_create(comments)
+        recount_comments(Post.objects.filter(
+            pk__in={comment.post_id for comment in comments}
+        ))
+        self.stats['comment'] += len(comments)
+
+    def load_follows(self, records):
+        pairs = set()
+        for record in records:
+            user_id = self.users.get(record.get('user'))
+            author_id = self.author_id(record)
+            if user_id is None or author_id is None or user_id == author_id:
+                self.stats['skipped'] += 1
+                continue
+            pairs.add((user_id, author_id))
+        existing = set()
+        if pairs:
+            existing = set(
+                Follow.objects.filter(
+                    user_id__in={user for user, _ in pairs},
+                    author_id__in={author for _, author in pairs},
+                ).values_list('user_id', 'author_id')
+            )
+        new = pairs - existing
+        Follow.objects.bulk_create([
+            Follow(user_id=user, author_id=author) for user, author in new
+        ])
+        users = {user for user, _ in new}
+        cache.delete_many(
+            [following_key(user) for user in users]
+            + [followers_key(author) for _, author in new]
+        )
+        mark_stale_many(users)
+        self.stats['follow'] += len(new)
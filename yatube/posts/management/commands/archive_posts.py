@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.archive import ARCHIVE_BATCH, archive_older_than
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые посты и их комментарии в архивные таблицы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(
+            settings, 'ARCHIVE_AFTER_DAYS', 365),
+            help='Архивировать посты старше N дней')
+        parser.add_argument('--batch', type=int, default=ARCHIVE_BATCH)
+
+    def handle(self, *args, **options):
+        total = archive_older_than(
+            options['days'], options['batch'], log=self.stdout.write
+        )
+        self.stdout.write('Всего перенесено: {}'.format(total))
@@ -0,0 +1,88 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from posts.benchmark import (SIZES, VIEWS, build_dataset, compare, dump,
+                             run_views)
+from posts.models import Post
+
+# Замеры чистят кэш и наполняют его данными синтетической базы,
+# поэтому общий кэш сайта им не достаётся.
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'core.backends.LocMemCache',
+        'LOCATION': 'benchmark',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит синтетический датасет в отдельной базе и замеряет '
+        'задержку, число запросов и пик памяти для вьюх posts'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=SIZES, default='10k')
+        parser.add_argument('--requests', type=int, default=100,
+                            help='Запросов на каждую вьюху')
+        parser.add_argument('--views', nargs='+', choices=VIEWS,
+                            default=VIEWS)
+        parser.add_argument('--db', default=os.path.join(
+            settings.BASE_DIR, 'benchmark.sqlite3'),
+            help='Файл базы для датасета, переиспользуется между запусками')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Пересоздать датасет')
+        parser.add_argument('--warm-cache', action='store_true',
+                            help='Не сбрасывать кэш между запросами')
+        parser.add_argument('--output', help='Файл для JSON-отчёта')
+        parser.add_argument('--baseline',
+                            help='Отчёт прошлого запуска для сравнения')
+
+    # cache_page берёт бэкенд кэша при импорте вьюх, а проверки
+    # импортируют urls: поэтому они запускаются уже с кэшем бенчмарка.
+    requires_system_checks = False
+
+    def handle(self, *args, **options):
+        with override_settings(CACHES=BENCHMARK_CACHES):
+            self.check()
+            self.run(options)
+
+    def run(self, options):
+        posts = SIZES[options['size']]
+        connection.settings_dict.setdefault('TEST', {})
+        connection.settings_dict['TEST']['NAME'] = options['db']
+        connection.creation.create_test_db(
+            verbosity=0,
+            autoclobber=True,
+            serialize=False,
+            keepdb=not options['rebuild'],
+        )
+        existing = Post.objects.count()
+        if not existing:
+            self.stderr.write('Строю датасет на {} постов'.format(posts))
+            build_dataset(posts, log=self.stderr.write)
+        elif existing != posts:
+            raise CommandError(
+                'В {} уже {} постов, запустите с --rebuild'.format(
+                    options['db'], existing)
+            )
+        report = run_views(
+            requests=options['requests'],
+            views=options['views'],
+            warm_cache=options['warm_cache'],
+        )
+        report['meta']['size'] = options['size']
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as baseline:
+                report['diff_percent'] = compare(report, json.load(baseline))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(dump(report))
+        else:
+            self.stdout.write(dump(report))
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import IMPORT_CHUNK, Importer
+
+
+class Command(BaseCommand):
+    help = 'Загружает посты, комментарии и подписки из JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл JSONL или - для stdin')
+        parser.add_argument('--chunk', type=int, default=IMPORT_CHUNK,
+                            help='Записей в одной транзакции')
+        parser.add_argument('--author',
+                            help='Автор для записей без поля author')
+        parser.add_argument('--create-users', action='store_true',
+                            help='Создавать отсутствующих пользователей')
+        parser.add_argument('--keep-ids', action='store_true',
+                            help='Сохранять id постов из файла')
+
+    def handle(self, *args, **options):
+        importer = Importer(
+            chunk=options['chunk'],
+            default_author=options['author'],
+            create_users=options['create_users'],
+            keep_ids=options['keep_ids'],
+        )
+        try:
+            if options['path'] == '-':
+                stats = importer.run(sys.stdin)
+            else:
+                with open(options['path'], encoding='utf-8') as source:
+                    stats = importer.run(source)
+        except ValueError as exc:
+            raise CommandError(exc)
+        for name, count in sorted(stats.items()):
+            self.stdout.write('{}: {}'.format(name, count))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.deletion import schedule_deletion
+from posts.models import Group, PendingDeletion, Post, User
+from posts.purge import PURGE_BATCH, purge
+
+LOOKUPS = {
+    PendingDeletion.USER: (User, 'username'),
+    PendingDeletion.POST: (Post, 'pk'),
+    PendingDeletion.GROUP: (Group, 'slug'),
+}
+
+
+class Command(BaseCommand):
+    help = ('Удаляет пользователя, пост или группу пачками. Без аргументов '
+            'доводит до конца все запланированные удаления')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', nargs='?', choices=LOOKUPS)
+        parser.add_argument('value', nargs='?',
+                            help='username, id поста или slug группы')
+        parser.add_argument('--batch', type=int, default=PURGE_BATCH)
+
+    def handle(self, *args, **options):
+        kind, value = options['kind'], options['value']
+        if kind is not None:
+            if value is None:
+                raise CommandError('Укажите, что удалять')
+            model, field = LOOKUPS[kind]
+            obj = model.objects.filter(**{field: value}).first()
+            if obj is None:
+                raise CommandError('{} {} не найден'.format(kind, value))
+            pending = [schedule_deletion(obj)]
+        else:
+            pending = PendingDeletion.objects.order_by('created')
+        for item in pending:
+            purge(item, options['batch'])
+            self.stdout.write('Удалено: {}'.format(item))
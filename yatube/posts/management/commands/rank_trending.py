@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import TRENDING_SIZE, rank, schedule_ranking
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает тренды по счётчикам последнего часа'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=TRENDING_SIZE)
+        parser.add_argument('--schedule', action='store_true',
+                            help='Запустить периодический пересчёт '
+                                 'через очередь задач')
+
+    def handle(self, *args, **options):
+        top = rank(options['size'])
+        self.stdout.write('Постов в тренде: {}'.format(len(top)))
+        if options['schedule']:
+            schedule_ranking()
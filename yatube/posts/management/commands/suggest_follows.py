@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.suggestions import SUGGESTIONS_SIZE, compute_suggestions
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации «на кого подписаться»'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Пересчитать всех, а не только изменившихся')
+        parser.add_argument('--size', type=int, default=SUGGESTIONS_SIZE)
+
+    def handle(self, *args, **options):
+        total = compute_suggestions(
+            options['full'], options['size'], log=self.stdout.write
+        )
+        self.stdout.write('Обновлено рекомендаций: {}'.format(total))
@@ -0,0 +1,53 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:02
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Копия регулярных выражений из posts.hashtags на момент миграции:
+# миграция не должна зависеть от того, как модуль изменится потом.
+TAG_RE = re.compile(r'(?<![\w&#])#(\w{1,100})')
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.+-]{0,149}\w)')
+
+
+def index_existing_posts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Tag = apps.get_model('posts', 'Tag')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    for post in Post.objects.only('pk', 'text').iterator():
+        names = {name.lower() for name in TAG_RE.findall(post.text)}
+        if names:
+            Tag.objects.bulk_create(
+                [Tag(name=name) for name in names],
+                ignore_conflicts=True
+            )
+            post.tags.set(Tag.objects.filter(name__in=names))
+        usernames = set(MENTION_RE.findall(post.text))
+        if usernames:
+            post.mentions.set(User.objects.filter(username__in=usernames))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0003_follow'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='mentions',
+            field=models.ManyToManyField(blank=True, related_name='mentioned_in', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('posts', models.ManyToManyField(blank=True, related_name='tags', to='posts.Post')),
+            ],
+        ),
+        migrations.RunPython(index_existing_posts, migrations.RunPython.noop),
+    ]
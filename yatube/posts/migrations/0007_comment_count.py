@@ -0,0 +1,48 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:18
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_comments(apps, schema_editor):
+    for post_model, comment_model in (('Post', 'Comment'),
+                                      ('ArchivedPost', 'ArchivedComment')):
+        Post = apps.get_model('posts', post_model)
+        Comment = apps.get_model('posts', comment_model)
+        counts = (
+            Comment.objects.filter(post=OuterRef('pk'))
+            .values('post').annotate(total=Count('pk')).values('total')
+        )
+        Post.objects.update(comment_count=Coalesce(
+            Subquery(counts, output_field=models.IntegerField()), 0
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpost',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(fields=['post', 'created', 'id'], name='posts_archi_post_id_9b034b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created', 'id'], name='posts_comme_post_id_9660d8_idx'),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+    ]
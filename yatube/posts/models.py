@@ -15,7 +15,7 @@ class Group(models.Model):
 
 class Post(models.Model):
     text = models.TextField()
-    pub_date = models.DateTimeField(auto_now_add=True)
+    pub_date = models.DateTimeField(auto_now_add=True, db_index=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE)
@@ -30,6 +30,13 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    mentions = models.ManyToManyField(
+        User,
+        blank=True,
+        related_name='mentioned_in'
+    )
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    view_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.text[:15]
@@ -53,6 +60,9 @@ class Comment(models.Model):
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['post', 'created', 'id'])]
+
     def __str__(self):
         return 'Comment by {} on {}'.format(self.author, self.post)
 
@@ -68,3 +78,128 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following'
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+        ]
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    posts = models.ManyToManyField(
+        Post,
+        blank=True,
+        related_name='tags'
+    )
+
+    def __str__(self):
+        return self.name
+
+
+class ArchivedPost(models.Model):
+    """Старый пост, перенесённый из Post командой archive_posts.
+
+    id сохраняется, поэтому ссылки на пост продолжают работать.
+    """
+
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField()
+    pub_date = models.DateTimeField(db_index=True)
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts'
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts'
+    )
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        blank=True
+    )
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    view_count = models.PositiveIntegerField(default=0, editable=False)
+    archived = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.text[:15]
+
+    class Meta:
+        ordering = ['-pub_date']
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments'
+    )
+    text = models.TextField()
+    created = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['post', 'created', 'id'])]
+
+    def __str__(self):
+        return 'Comment by {} on {}'.format(self.author, self.post)
+
+
+class PendingDeletion(models.Model):
+    """Объект, удаляемый в фоне пачками.
+
+    Пока запись существует, объект скрыт из лент и страниц.
+    """
+
+    USER = 'user'
+    POST = 'post'
+    GROUP = 'group'
+    KINDS = (
+        (USER, 'Пользователь'),
+        (POST, 'Пост'),
+        (GROUP, 'Группа'),
+    )
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.IntegerField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
+
+    def __str__(self):
+        return '{} {}'.format(self.kind, self.object_id)
+
+
+class FollowSuggestion(models.Model):
+    """Заранее посчитанные рекомендации «на кого подписаться»."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='follow_suggestion'
+    )
+    # id авторов через запятую, лучшие первыми.
+    authors = models.TextField(blank=True)
+    stale = models.BooleanField(default=False, db_index=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def author_ids(self):
+        return [int(pk) for pk in self.authors.split(',') if pk]
+
+    def __str__(self):
+        return 'Suggestions for {}'.format(self.user_id)
@@ -0,0 +1,159 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .api import post_cache_key
+from .archive import bump_archive_version
+from .comments import recount_comments
+from .deletion import forget_hidden
+from .follows import followers_key, following_key
+from .models import (ArchivedComment, ArchivedPost, Comment, Follow, Group,
+                     PendingDeletion, Post, Tag, User)
+from .suggestions import mark_stale_many
+
+PURGE_BATCH = 1000
+
+
+def delete_in_batches(queryset, batch=PURGE_BATCH):
+    """Удаляет строки пачками без Collector и сигналов: в памяти
+    не больше batch id, каждая пачка - отдельная транзакция."""
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                queryset.order_by().values_list('pk', flat=True)[:batch]
+            )
+            if not ids:
+                return total
+            rows = queryset.model.objects.filter(pk__in=ids)
+            rows._raw_delete(rows.db)
+        total += len(ids)
+
+
+def delete_comments(comments, batch=PURGE_BATCH, recount=True):
+    """Удаляет комментарии пачками и пересчитывает счётчики их постов."""
+    post_model = comments.model._meta.get_field('post').related_model
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                comments.order_by().values_list('pk', 'post_id')[:batch]
+            )
+            if not rows:
+                return total
+            batch_comments = comments.model.objects.filter(
+                pk__in=[pk for pk, _ in rows]
+            )
+            batch_comments._raw_delete(batch_comments.db)
+            if recount:
+                recount_comments(post_model.objects.filter(
+                    pk__in={post_id for _, post_id in rows}
+                ))
+        total += len(rows)
+
+
+def delete_posts(posts, batch=PURGE_BATCH):
+    """Удаляет посты пачками: сначала их комментарии, затем связи
+    с тегами и упоминаниями и сами строки."""
+    total = 0
+    while True:
+        ids = list(posts.order_by().values_list('pk', flat=True)[:batch])
+        if not ids:
+            return total
+        delete_comments(
+            posts.model._meta.get_field('comments').related_model
+            .objects.filter(post_id__in=ids),
+            batch, recount=False
+        )
+        with transaction.atomic():
+            if posts.model is Post:
+                Tag.posts.through.objects.filter(post_id__in=ids).delete()
+                Post.mentions.through.objects.filter(
+                    post_id__in=ids
+                ).delete()
+            rows = posts.model.objects.filter(pk__in=ids)
+            rows._raw_delete(rows.db)
+        cache.delete_many([post_cache_key(pk) for pk in ids])
+        total += len(ids)
+
+
+def delete_follows(follows, batch=PURGE_BATCH):
+    """Удаляет подписки пачками. Для каждой пачки сбрасывает кеш
+    подписок подписчиков и счётчики подписчиков авторов, а рекомендации
+    подписчиков помечает устаревшими."""
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(follows.order_by().values_list(
+                'pk', 'user_id', 'author_id'
+            )[:batch])
+            if not rows:
+                return total
+            user_ids = {user_id for _, user_id, _ in rows}
+            mark_stale_many(user_ids)
+            batch_follows = Follow.objects.filter(
+                pk__in=[pk for pk, _, _ in rows]
+            )
+            batch_follows._raw_delete(batch_follows.db)
+        cache.delete_many(
+            [following_key(user_id) for user_id in user_ids]
+            + [followers_key(author_id) for _, _, author_id in rows]
+        )
+        total += len(rows)
+
+
+def detach_posts(posts, batch=PURGE_BATCH):
+    """Отвязывает посты удаляемой группы пачками."""
+    while True:
+        with transaction.atomic():
+            ids = list(posts.order_by().values_list('pk', flat=True)[:batch])
+            if not ids:
+                return
+            posts.model.objects.filter(pk__in=ids).update(group=None)
+        cache.delete_many([post_cache_key(pk) for pk in ids])
+
+
+def purge_user(user, batch=PURGE_BATCH):
+    delete_comments(Comment.objects.filter(author=user), batch)
+    delete_comments(ArchivedComment.objects.filter(author=user), batch)
+    delete_posts(Post.objects.filter(author=user), batch)
+    delete_posts(ArchivedPost.objects.filter(author=user), batch)
+    delete_follows(
+        Follow.objects.filter(Q(user=user) | Q(author=user)), batch
+    )
+    delete_in_batches(
+        Post.mentions.through.objects.filter(user=user), batch
+    )
+    user.delete()
+
+
+def purge_post(post, batch=PURGE_BATCH):
+    delete_posts(Post.objects.filter(pk=post.pk), batch)
+
+
+def purge_group(group, batch=PURGE_BATCH):
+    detach_posts(Post.objects.filter(group=group), batch)
+    detach_posts(ArchivedPost.objects.filter(group=group), batch)
+    group.delete()
+
+
+PURGERS = {
+    PendingDeletion.USER: (User, purge_user),
+    PendingDeletion.POST: (Post, purge_post),
+    PendingDeletion.GROUP: (Group, purge_group),
+}
+
+
+def purge(pending, batch=PURGE_BATCH):
+    """Доводит до конца удаление, запланированное schedule_deletion.
+
+    Каждая пачка коммитится отдельно, поэтому прерванную очистку
+    можно просто запустить ещё раз.
+    """
+    model, purger = PURGERS[pending.kind]
+    obj = model.objects.filter(pk=pending.object_id).first()
+    if obj is not None:
+        purger(obj, batch)
+    bump_archive_version()
+    pending.delete()
+    forget_hidden()
@@ -0,0 +1,47 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.tasks import enqueue
+
+from . import changes
+from .api import post_cache_key
+from .comments import add_to_count
+from .hashtags import index_post
+from .models import Comment, Post
+
+
+@receiver(post_save, sender=Post)
+def reindex_post_text(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    index_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def schedule_thumbnails(sender, instance, raw=False, **kwargs):
+    if raw or not instance.image:
+        return
+    enqueue(
+        'posts.make_thumbnails',
+        {'post_id': instance.pk},
+        key='thumbnails:{}:{}'.format(instance.pk, instance.image.name)
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def drop_cached_post(sender, instance, **kwargs):
+    cache.delete(post_cache_key(instance.pk))
+    changes.touch()
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        add_to_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    add_to_count(instance.post_id, -1)
@@ -0,0 +1,209 @@
+import heapq
+import time
+from array import array
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Q
+
+from core.tasks import enqueue
+from .models import Follow, FollowSuggestion, User
+
+SUGGESTIONS_SIZE = 10
+STREAM_CHUNK = 5000
+WRITE_BATCH = 500
+DIRTY_SIZE_KEY = 'suggestions:dirty:n'
+DIRTY_DONE_KEY = 'suggestions:dirty:done'
+DIRTY_RETRY_KEY = 'suggestions:dirty:retry'
+
+
+class FollowGraph:
+    """Граф подписок в виде CSR: подписки пользователя u лежат
+    в targets[offsets[u]:offsets[u + 1]], индексом служит id.
+
+    Рёбра читаются из базы потоком, в памяти только два массива int64.
+    """
+
+    def __init__(self, max_user_id):
+        self.offsets = array('q', [0]) * (max_user_id + 2)
+        self.targets = array('q')
+        self.in_degree = array('q', [0]) * (max_user_id + 1)
+
+    @classmethod
+    def load(cls, chunk=STREAM_CHUNK):
+        max_user_id = User.objects.aggregate(top=Max('pk'))['top'] or 0
+        graph = cls(max_user_id)
+        edges = (
+            Follow.objects.order_by('user_id', 'author_id')
+            .values_list('user_id', 'author_id').iterator(chunk_size=chunk)
+        )
+        previous = None
+        for user_id, author_id in edges:
+            if (user_id, author_id) == previous:
+                continue
+            previous = user_id, author_id
+            graph.targets.append(author_id)
+            graph.offsets[user_id + 1] += 1
+            graph.in_degree[author_id] += 1
+        for i in range(1, len(graph.offsets)):
+            graph.offsets[i] += graph.offsets[i - 1]
+        return graph
+
+    def following(self, user_id):
+        if user_id + 1 >= len(self.offsets):
+            return self.targets[0:0]
+        return self.targets[self.offsets[user_id]:self.offsets[user_id + 1]]
+
+    def popular(self, size):
+        return heapq.nlargest(
+            size,
+            (pk for pk, degree in enumerate(self.in_degree) if degree),
+            key=lambda pk: (self.in_degree[pk], -pk)
+        )
+
+    def suggest(self, user_id, size=SUGGESTIONS_SIZE, popular=()):
+        """Друзья друзей по числу общих подписок, затем популярные."""
+        followed = set(self.following(user_id))
+        followed.add(user_id)
+        scores = Counter()
+        for friend in self.following(user_id):
+            for candidate in self.following(friend):
+                if candidate not in followed:
+                    scores[candidate] += 1
+        best = heapq.nlargest(
+            size, scores, key=lambda pk: (scores[pk], -pk)
+        )
+        for pk in popular:
+            if len(best) >= size:
+                break
+            if pk not in followed and pk not in scores:
+                best.append(pk)
+        return best
+
+
+def mark_stale(user):
+    """После подписки или отписки user меняется окружение самого
+    user и всех, кто на него подписан."""
+    mark_stale_many([user.pk])
+
+
+def mark_stale_many(user_ids):
+    """То же, что mark_stale, одним UPDATE для пачки пользователей."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    FollowSuggestion.objects.filter(
+        Q(user_id__in=user_ids)
+        | Q(user_id__in=Follow.objects.filter(
+            author_id__in=user_ids
+        ).values('user_id'))
+    ).update(stale=True)
+
+
+def dirty_key(slot):
+    return 'suggestions:dirty:{}'.format(slot)
+
+
+def mark_stale_later(user):
+    """Как mark_stale, но без записи в базу: id пользователя ложится
+    в очередной слот кэша, а compute_suggestions разбирает слоты
+    одним UPDATE на пачку."""
+    cache.add(DIRTY_SIZE_KEY, 0, None)
+    try:
+        slot = cache.incr(DIRTY_SIZE_KEY)
+    except ValueError:
+        mark_stale(user)
+        return
+    cache.set(dirty_key(slot), user.pk, None)
+
+
+def drain_stale():
+    """Переносит отметки mark_stale_later в базу. Слоты, занятые,
+    но ещё не записанные, проверяются ещё раз при следующем запуске."""
+    last = cache.get(DIRTY_SIZE_KEY) or 0
+    done = cache.get(DIRTY_DONE_KEY) or 0
+    if done > last:
+        # Счётчик вытеснен из кэша и начат заново.
+        done = 0
+    slots = (cache.get(DIRTY_RETRY_KEY) or []) + list(
+        range(done + 1, last + 1)
+    )
+    missing = []
+    for start in range(0, len(slots), WRITE_BATCH):
+        chunk = slots[start:start + WRITE_BATCH]
+        found = cache.get_many([dirty_key(slot) for slot in chunk])
+        mark_stale_many(set(found.values()))
+        cache.delete_many(list(found))
+        missing.extend(
+            slot for slot in chunk
+            if slot > done and dirty_key(slot) not in found
+        )
+    cache.set(DIRTY_RETRY_KEY, missing, None)
+    cache.set(DIRTY_DONE_KEY, last, None)
+
+
+def users_to_update(full=False):
+    users = User.objects.filter(is_active=True)
+    if not full:
+        users = users.filter(
+            Q(follow_suggestion__isnull=True)
+            | Q(follow_suggestion__stale=True)
+        )
+    return users.order_by('pk').values_list('pk', flat=True)
+
+
+def save(rows):
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(pk__in=list(rows)).delete()
+        FollowSuggestion.objects.bulk_create([
+            FollowSuggestion(
+                user_id=user_id, authors=','.join(map(str, authors))
+            )
+            for user_id, authors in rows.items()
+        ])
+
+
+def compute_suggestions(full=False, size=SUGGESTIONS_SIZE, log=None):
+    """Пересчитывает рекомендации. Без full - только для новых
+    пользователей и тех, чьё окружение изменилось."""
+    drain_stale()
+    graph = FollowGraph.load()
+    popular = graph.popular(size * 2)
+    users = users_to_update(full)
+    last = 0
+    total = 0
+    while True:
+        ids = list(users.filter(pk__gt=last)[:WRITE_BATCH])
+        if not ids:
+            return total
+        save({pk: graph.suggest(pk, size, popular) for pk in ids})
+        last = ids[-1]
+        total += len(ids)
+        if log:
+            log('Пользователей: {}'.format(total))
+
+
+def schedule_suggestions(delay=0):
+    """Ставит пересчёт рекомендаций на интервал SUGGESTIONS_SECONDS;
+    ключ не даёт запланировать один интервал дважды."""
+    interval = getattr(settings, 'SUGGESTIONS_SECONDS', 3600)
+    period = int((time.time() + delay) // interval)
+    return enqueue(
+        'posts.suggest_follows',
+        key='suggest_follows:{}'.format(period),
+        delay=delay,
+    )
+
+
+def suggestions_for(user, size=SUGGESTIONS_SIZE):
+    """Готовые рекомендации: строка по первичному ключу и авторы."""
+    if not user.is_authenticated:
+        return []
+    row = FollowSuggestion.objects.filter(user=user).first()
+    if row is None:
+        return []
+    ids = row.author_ids()[:size]
+    authors = User.objects.filter(is_active=True).in_bulk(ids)
+    return [authors[pk] for pk in ids if pk in authors]
@@ -0,0 +1,56 @@
+from django.conf import settings
+from sorl.thumbnail import get_thumbnail
+
+from core.tasks import on_worker_start, task
+
+from . import trending
+from .models import PendingDeletion, Post
+from .purge import purge
+from .suggestions import compute_suggestions, schedule_suggestions
+
+THUMBNAIL_GEOMETRY = '960x339'
+
+
+@task('posts.make_thumbnails')
+def make_thumbnails(post_id):
+    """Заранее готовит превью картинки, чтобы лента не ждала Pillow."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    get_thumbnail(
+        post.image, THUMBNAIL_GEOMETRY, crop='center', upscale=True
+    )
+
+
+@task('posts.purge')
+def purge_pending(pending_id):
+    """Удаляет пачками объект, скрытый schedule_deletion."""
+    pending = PendingDeletion.objects.filter(pk=pending_id).first()
+    if pending is not None:
+        purge(pending)
+
+
+@task('posts.suggest_follows')
+def suggest_follows(full=False):
+    """Пересчитывает рекомендации подписок и планирует следующий
+    пересчёт, в том числе после ошибки."""
+    try:
+        compute_suggestions(full)
+    finally:
+        schedule_suggestions(
+            getattr(settings, 'SUGGESTIONS_SECONDS', 3600)
+        )
+
+
+@task('posts.rank_trending')
+def rank_trending():
+    """Пересчитывает тренды и планирует следующий пересчёт. Следующий
+    ставится и после ошибки, иначе цепочка оборвётся и тренды замрут."""
+    try:
+        trending.rank()
+    finally:
+        trending.schedule_ranking()
+
+
+on_worker_start(trending.schedule_ranking)
+on_worker_start(schedule_suggestions)
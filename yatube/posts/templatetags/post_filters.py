@@ -0,0 +1,44 @@
+from django import template
+from django.urls import reverse
+from django.utils.html import conditional_escape, format_html
+from django.utils.safestring import mark_safe
+
+from ..follows import following_among
+from ..hashtags import MENTION_RE, TAG_RE
+
+register = template.Library()
+
+
+def _tag_link(match):
+    return format_html(
+        '<a href="{}">#{}</a>',
+        reverse('posts:tag_posts', args=[match.group(1).lower()]),
+        match.group(1)
+    )
+
+
+def _mention_link(match):
+    return format_html(
+        '<a href="{}">@{}</a>',
+        reverse('posts:profile', args=[match.group(1)]),
+        match.group(1)
+    )
+
+
+@register.filter(needs_autoescape=True)
+def hashtags(text, autoescape=True):
+    """Превращает #теги и @упоминания в ссылки."""
+    if autoescape:
+        text = conditional_escape(text)
+    text = TAG_RE.sub(_tag_link, text)
+    text = MENTION_RE.sub(_mention_link, text)
+    return mark_safe(text)
+
+
+@register.simple_tag(takes_context=True)
+def followed_authors(context, posts):
+    """id авторов постов страницы, на которых подписан пользователь:
+    один набор подписок из кэша на всю страницу."""
+    return following_among(
+        context['request'].user, {post.author_id for post in posts}
+    )
@@ -0,0 +1,96 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..api import API_PAGE_SIZE, post_cache_key
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create([
+            Post(author=cls.author, group=cls.group, text='Пост %s' % i)
+            for i in range(API_PAGE_SIZE + 5)
+        ])
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_cursor_pagination(self):
+        """Курсор обходит ленту без пропусков и повторов"""
+        seen = []
+        url = reverse('posts:api_index')
+        data = self.client.get(url).json()
+        seen += [post['id'] for post in data['results']]
+        self.assertEqual(len(data['results']), API_PAGE_SIZE)
+        data = self.client.get(url, {'cursor': data['next']}).json()
+        seen += [post['id'] for post in data['results']]
+        self.assertIsNone(data['next'])
+        expected = list(
+            Post.objects.order_by('-pub_date', '-id')
+            .values_list('id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_bad_cursor(self):
+        """Неверный курсор даёт 400"""
+        response = self.client.get(
+            reverse('posts:api_index'), {'cursor': 'мусор'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_group_profile_follow(self):
+        """Ленты группы, профиля и подписок отдают посты"""
+        urls = (
+            reverse('posts:api_group', args=[self.group.slug]),
+            reverse('posts:api_profile', args=[self.author.username]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                self.assertEqual(data['results'][0]['author'], 'author')
+        response = self.client.get(reverse('posts:api_follow'))
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        self.client.force_login(self.reader)
+        data = self.client.get(reverse('posts:api_follow')).json()
+        self.assertEqual(len(data['results']), API_PAGE_SIZE)
+
+    def test_batch_uses_cache(self):
+        """Мульти-get берёт посты из кэша и сохраняет порядок id"""
+        ids = list(Post.objects.values_list('id', flat=True)[:3])
+        url = reverse('posts:api_posts_batch')
+        query = {'ids': ','.join(map(str, reversed(ids)))}
+        data = self.client.get(url, query).json()
+        self.assertEqual(
+            [post['id'] for post in data['results']], ids[::-1]
+        )
+        with self.assertNumQueries(0):
+            self.client.get(url, query)
+
+    def test_cache_invalidated_on_save(self):
+        """Изменение поста сбрасывает кэш API"""
+        post = Post.objects.first()
+        self.client.get(reverse('posts:api_post', args=[post.pk]))
+        self.assertIsNotNone(cache.get(post_cache_key(post.pk)))
+        post.text = 'Новый текст'
+        post.save()
+        data = self.client.get(
+            reverse('posts:api_post', args=[post.pk])
+        ).json()
+        self.assertEqual(data['text'], 'Новый текст')
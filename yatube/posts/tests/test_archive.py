@@ -0,0 +1,129 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import api
+from ..export import iter_records
+from ..models import ArchivedComment, ArchivedPost, Comment, Group, Post
+from ..view_counts import view_counter
+
+User = get_user_model()
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.old = Post.objects.create(
+            author=self.author, group=self.group, text='Старый #пост'
+        )
+        Post.objects.filter(pk=self.old.pk).update(
+            pub_date=timezone.now() - timedelta(days=400)
+        )
+        Comment.objects.create(
+            post=self.old, author=self.author, text='Комментарий'
+        )
+        self.new = Post.objects.create(
+            author=self.author, group=self.group, text='Новый'
+        )
+
+    def archive(self):
+        call_command('archive_posts', '--days', '365', '--batch', '1',
+                     stdout=io.StringIO())
+
+    def tearDown(self):
+        # Иначе буфер просмотров переживёт тестовую базу.
+        view_counter.pending.clear()
+
+    def test_archive_moves_old_posts(self):
+        """Старые посты и их комментарии переезжают в архив"""
+        self.archive()
+        self.assertFalse(Post.objects.filter(pk=self.old.pk).exists())
+        self.assertTrue(Post.objects.filter(pk=self.new.pk).exists())
+        archived = ArchivedPost.objects.get(pk=self.old.pk)
+        self.assertEqual(archived.text, 'Старый #пост')
+        self.assertEqual(archived.group, self.group)
+        self.assertEqual(archived.comment_count, 1)
+        self.assertEqual(ArchivedComment.objects.get().post, archived)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_lists_include_archive(self):
+        """Ленты дополняются архивными постами после горячих"""
+        self.archive()
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                page_obj = self.client.get(url).context['page_obj']
+                self.assertEqual(page_obj.paginator.count, 2)
+                self.assertEqual(
+                    [post.pk for post in page_obj],
+                    [self.new.pk, self.old.pk]
+                )
+
+    def test_archived_post_detail(self):
+        """Архивный пост открывается только для чтения"""
+        self.archive()
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.old.pk])
+        )
+        self.assertTrue(response.context['archived'])
+        self.assertEqual(len(response.context['comments']), 1)
+        self.assertNotContains(
+            response, reverse('posts:add_comment', args=[self.old.pk])
+        )
+
+    def test_api_and_export_include_archive(self):
+        """API и выгрузка видят архивные посты и комментарии"""
+        self.archive()
+        response = self.client.get(
+            reverse('posts:api_post', args=[self.old.pk])
+        )
+        self.assertEqual(response.json()['text'], 'Старый #пост')
+        with mock.patch.object(api, 'API_PAGE_SIZE', 1):
+            first = self.client.get(reverse('posts:api_index')).json()
+            second = self.client.get(
+                reverse('posts:api_index'), {'cursor': first['next']}
+            ).json()
+        self.assertEqual(first['results'][0]['id'], self.new.pk)
+        self.assertEqual(second['results'][0]['id'], self.old.pk)
+        self.assertIsNone(second['next'])
+        urls = [
+            reverse('posts:api_index'),
+            reverse('posts:api_group', args=[self.group.slug]),
+            reverse('posts:api_profile', args=[self.author.username]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                results = self.client.get(url).json()['results']
+                self.assertEqual(
+                    [post['id'] for post in results],
+                    [self.new.pk, self.old.pk]
+                )
+        records = list(iter_records(self.author))
+        self.assertEqual(
+            [(record['type'], record['id']) for record in records],
+            [('post', self.new.pk), ('post', self.old.pk),
+             ('comment', ArchivedComment.objects.get().pk)]
+        )
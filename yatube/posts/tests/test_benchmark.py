@@ -0,0 +1,21 @@
+from django.test import TestCase
+
+from ..benchmark import VIEWS, build_dataset, compare, run_views
+from ..models import Comment, Follow, Post
+
+
+class BenchmarkTests(TestCase):
+    def test_dataset_and_report(self):
+        """Бенчмарк строит датасет и отчёт по всем вьюхам"""
+        build_dataset(posts=60, users=8, groups=3, comments=20)
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 20)
+        self.assertTrue(Follow.objects.exists())
+        report = run_views(requests=3)
+        self.assertEqual(set(report['views']), set(VIEWS))
+        for stats in report['views'].values():
+            self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+            self.assertGreater(stats['queries'], 0)
+        self.assertEqual(
+            set(compare(report, report)['index'].values()), {0.0}
+        )
@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..comments import COMMENTS_PAGE_SIZE, recount_comments
+from ..models import Comment, Post
+from ..view_counts import view_counter
+
+User = get_user_model()
+
+
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        Comment.objects.bulk_create([
+            Comment(post=cls.post, author=cls.author, text=str(i))
+            for i in range(COMMENTS_PAGE_SIZE + 5)
+        ])
+        recount_comments()
+
+    def setUp(self):
+        self.client = Client()
+
+    def tearDown(self):
+        # Иначе буфер просмотров переживёт тестовую базу.
+        view_counter.pending.clear()
+
+    def test_stored_count(self):
+        """Число комментариев хранится в посте и следует за изменениями"""
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, COMMENTS_PAGE_SIZE + 5)
+        comment = Comment.objects.create(
+            post=self.post, author=self.author, text='Ещё'
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, COMMENTS_PAGE_SIZE + 6)
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, COMMENTS_PAGE_SIZE + 5)
+
+    def test_first_page_and_fragment(self):
+        """Первая страница рендерится в посте, остальное - фрагментом"""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PAGE_SIZE)
+        self.assertEqual(comments[0].text, '0')
+        cursor = response.context['next_cursor']
+        self.assertIsNotNone(cursor)
+        fragment = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk]),
+            {'after': cursor}
+        )
+        self.assertEqual(
+            [comment.text for comment in fragment.context['comments']],
+            [str(i) for i in range(COMMENTS_PAGE_SIZE, COMMENTS_PAGE_SIZE + 5)]
+        )
+        self.assertIsNone(fragment.context['next_cursor'])
+        self.assertNotContains(fragment, '<html')
+
+    def test_bad_cursor(self):
+        """Испорченный курсор отдаёт первую страницу"""
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk]),
+            {'after': 'мусор'}
+        )
+        self.assertEqual(response.context['comments'][0].text, '0')
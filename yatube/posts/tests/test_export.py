@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text='Пост %s' % i
+            )
+            for i in range(3)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.author, text='Коммент'
+        )
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def export(self, fmt):
+        response = self.author_client.get(
+            reverse('posts:profile_export', args=[self.author.username]),
+            {'format': fmt}
+        )
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_jsonl(self):
+        """JSONL содержит все посты и комментарии автора"""
+        records = [
+            json.loads(line) for line in self.export('jsonl').splitlines()
+        ]
+        self.assertEqual(
+            [record['type'] for record in records],
+            ['post', 'post', 'post', 'comment']
+        )
+        self.assertEqual(records[0]['text'], 'Пост 0')
+        self.assertEqual(records[0]['group'], 'test-slug')
+        self.assertEqual(records[3]['post_id'], self.posts[0].pk)
+
+    def test_export_csv(self):
+        """CSV выгружается с заголовком"""
+        rows = list(csv.DictReader(io.StringIO(self.export('csv'))))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[3]['type'], 'comment')
+
+    def test_export_only_for_author(self):
+        """Чужой пользователь не может выгрузить посты"""
+        other = User.objects.create_user(username='other')
+        client = Client()
+        client.force_login(other)
+        response = client.get(
+            reverse('posts:profile_export', args=[self.author.username])
+        )
+        self.assertRedirects(
+            response, reverse('posts:profile', args=[self.author.username])
+        )
+
+    def test_export_command(self):
+        """Команда export_posts пишет JSONL в stdout"""
+        out = io.StringIO()
+        call_command('export_posts', 'author', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 4)
@@ -0,0 +1,88 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..deletion import schedule_deletion
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост в ленте'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_feeds_contain_post(self):
+        """Все ленты отдают последний пост"""
+        urls = (
+            reverse('posts:index_rss'),
+            reverse('posts:index_atom'),
+            reverse('posts:group_rss', args=[self.group.slug]),
+            reverse('posts:group_atom', args=[self.group.slug]),
+            reverse('posts:author_rss', args=[self.author.username]),
+            reverse('posts:author_atom', args=[self.author.username]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertContains(response, 'Пост в ленте')
+                self.assertIn('Last-Modified', response)
+
+    def test_unknown_group_feed(self):
+        """Лента несуществующей группы отдаёт 404"""
+        response = self.client.get(reverse('posts:group_rss', args=['no']))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_conditional_get(self):
+        """Без изменений постов лента отвечает 304"""
+        url = reverse('posts:index_rss')
+        response = self.client.get(url)
+        since = response['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_edit_and_delete_change_feed(self):
+        """Правка и удаление поста меняют ETag и содержимое ленты"""
+        url = reverse('posts:group_rss', args=[self.group.slug])
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Черновик'
+        )
+        etag = self.client.get(url)['ETag']
+        post.text = 'Исправлено'
+        post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Исправлено')
+        etag = response['ETag']
+        schedule_deletion(post)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotContains(response, 'Исправлено')
+
+    def test_hidden_group_feed(self):
+        """Лента удаляемой группы отдаёт 404"""
+        group = Group.objects.create(title='Удаляемая', slug='gone')
+        schedule_deletion(group)
+        response = self.client.get(reverse('posts:group_rss', args=['gone']))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
@@ -0,0 +1,158 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..follows import (follow, follower_counts, following_among,
+                       following_ids, is_following, unfollow)
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.authors = [
+            User.objects.create_user(username='author%s' % i)
+            for i in range(3)
+        ]
+        Follow.objects.create(user=cls.user, author=cls.authors[0])
+        Follow.objects.create(user=cls.user, author=cls.authors[1])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_following_cached(self):
+        """Подписки читаются из кэша после первого запроса"""
+        expected = {self.authors[0].pk, self.authors[1].pk}
+        with self.assertNumQueries(1):
+            self.assertEqual(following_ids(self.user), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual(following_ids(self.user), expected)
+            self.assertTrue(is_following(self.user, self.authors[0]))
+            self.assertEqual(
+                following_among(
+                    self.user, [self.authors[1].pk, self.authors[2].pk]
+                ),
+                {self.authors[1].pk}
+            )
+
+    def test_follower_counts(self):
+        """Число подписчиков считается одним запросом на всех авторов"""
+        ids = [author.pk for author in self.authors]
+        with self.assertNumQueries(1):
+            counts = follower_counts(ids)
+        self.assertEqual(counts, dict(zip(ids, [1, 1, 0])))
+        with self.assertNumQueries(0):
+            follower_counts(ids)
+
+    def test_follow_views_invalidate(self):
+        """Подписка и отписка сбрасывают закэшированный граф"""
+        author = self.authors[2]
+        following_ids(self.user)
+        follower_counts([author.pk])
+        self.client.get(
+            reverse('posts:profile_follow', args=[author.username])
+        )
+        self.assertIn(author.pk, following_ids(self.user))
+        self.assertEqual(follower_counts([author.pk])[author.pk], 1)
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[author.username])
+        )
+        self.assertNotIn(author.pk, following_ids(self.user))
+        self.assertEqual(follower_counts([author.pk])[author.pk], 0)
+
+    def test_group_follow_buttons(self):
+        """В ленте группы кнопки подписки знают, на кого подписан
+        пользователь"""
+        group = Group.objects.create(title='Группа', slug='group')
+        for author in (self.authors[0], self.authors[2], self.user):
+            Post.objects.create(author=author, group=group, text='Пост')
+        response = self.client.get(
+            reverse('posts:group_list', args=[group.slug])
+        )
+        self.assertContains(response, reverse(
+            'posts:profile_unfollow', args=[self.authors[0].username]
+        ))
+        self.assertContains(response, reverse(
+            'posts:profile_follow', args=[self.authors[2].username]
+        ))
+        self.assertNotContains(response, reverse(
+            'posts:profile_follow', args=[self.user.username]
+        ))
+
+    def test_follow_feed_subquery(self):
+        """Лента подписок фильтрует авторов подзапросом, а не списком id"""
+        post = Post.objects.create(author=self.authors[0], text='Пост')
+        Post.objects.create(author=self.authors[2], text='Чужой')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+        feed = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT "posts_post"."id"')
+        ]
+        self.assertTrue(feed)
+        for sql in feed:
+            self.assertIn('FROM "posts_follow"', sql)
+
+    def test_stale_cache_elsewhere(self):
+        """Подписку решает база: устаревший кэш другого воркера
+        не ломает отписку и не завышает число подписчиков"""
+        author = self.authors[2]
+        following_ids(self.user)
+        follower_counts([author.pk])
+        Follow.objects.create(user=self.user, author=author)
+        self.assertFalse(follow(self.user, author))
+        self.assertEqual(follower_counts([author.pk])[author.pk], 0)
+        self.assertTrue(unfollow(self.user, author))
+        self.assertFalse(
+            Follow.objects.filter(user=self.user, author=author).exists()
+        )
+        self.assertFalse(unfollow(self.user, author))
+
+    def test_ajax_follow(self):
+        """POST-подписка отдаёт состояние кнопки и число подписчиков"""
+        author = self.authors[2]
+        url = reverse('posts:api_profile_follow', args=[author.username])
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.post(url).json()
+        self.assertEqual(data, {'following': True, 'followers': 1})
+        writes = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+        ]
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(self.client.post(url).json(), data)
+        self.assertEqual(
+            Follow.objects.filter(user=self.user, author=author).count(), 1
+        )
+        data = self.client.post(
+            reverse('posts:api_profile_unfollow', args=[author.username])
+        ).json()
+        self.assertEqual(data, {'following': False, 'followers': 0})
+
+    def test_ajax_follow_errors(self):
+        """Эндпоинты принимают только POST от авторизованных"""
+        url = reverse(
+            'posts:api_profile_follow', args=[self.authors[0].username]
+        )
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.METHOD_NOT_ALLOWED
+        )
+        self.assertEqual(
+            Client().post(url).status_code, HTTPStatus.UNAUTHORIZED
+        )
+        own = reverse('posts:api_profile_follow', args=[self.user.username])
+        self.assertEqual(
+            self.client.post(own).status_code, HTTPStatus.BAD_REQUEST
+        )
@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.core.cache import cache
+
+from ..hashtags import extract_mentions, extract_tags
+from ..models import Post, Tag
+
+User = get_user_model()
+
+
+class HashtagTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Привет, @reader! #Python и #джанго',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_extract(self):
+        """Теги и упоминания выделяются из текста"""
+        self.assertEqual(
+            extract_tags('#One #two&#39; a#b #one'), {'one', 'two'}
+        )
+        self.assertEqual(
+            extract_mentions('@ann, mail@x.ru @bob.'), {'ann', 'bob'}
+        )
+
+    def test_post_indexed_on_save(self):
+        """При сохранении пост попадает в индекс тегов и упоминаний"""
+        self.assertEqual(
+            set(self.post.tags.values_list('name', flat=True)),
+            {'python', 'джанго'}
+        )
+        self.assertIn(self.post, self.reader.mentioned_in.all())
+        self.post.text = 'Без тегов'
+        self.post.save()
+        self.assertFalse(self.post.tags.exists())
+        self.assertFalse(self.post.mentions.exists())
+
+    def test_tag_page(self):
+        """Страница тега показывает посты с тегом"""
+        response = self.reader_client.get(
+            reverse('posts:tag_posts', args=['PYTHON'])
+        )
+        self.assertEqual(response.context['tag'], Tag.objects.get(
+            name='python'))
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+        self.assertContains(
+            response, reverse('posts:tag_posts', args=['джанго'])
+        )
+
+    def test_mentions_page(self):
+        """Страница упоминаний показывает посты с @username"""
+        response = self.reader_client.get(reverse('posts:mentions'))
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+        author_client = Client()
+        author_client.force_login(self.author)
+        response = author_client.get(reverse('posts:mentions'))
+        self.assertEqual(len(response.context['page_obj']), 0)
@@ -0,0 +1,103 @@
+import io
+import json
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from ..follows import is_following
+from ..importer import IdMap
+from ..models import Comment, Follow, FollowSuggestion, Group, Post
+
+User = get_user_model()
+
+
+class ImportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def import_records(self, records, *args):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as source:
+            for record in records:
+                source.write(json.dumps(record, ensure_ascii=False) + '\n')
+            source.flush()
+            out = io.StringIO()
+            call_command('import_posts', source.name, *args, stdout=out)
+        return out.getvalue()
+
+    def test_import(self):
+        """Импорт создаёт посты, комментарии, подписки и теги"""
+        records = [
+            {'type': 'post', 'id': 10, 'author': 'author',
+             'group': 'test-slug', 'date': '2020-01-02T03:04:05+00:00',
+             'text': 'Первый #импорт'},
+            {'type': 'post', 'id': 11, 'author': 'new', 'text': 'Второй'},
+            {'type': 'comment', 'post_id': 10, 'author': 'new',
+             'text': 'Коммент'},
+            {'type': 'follow', 'user': 'new', 'author': 'author'},
+            {'type': 'follow', 'user': 'new', 'author': 'author'},
+            {'type': 'unknown'},
+        ]
+        out = self.import_records(records, '--create-users', '--chunk', '2')
+        self.assertIn('post: 2', out)
+        first = Post.objects.get(text='Первый #импорт')
+        self.assertEqual(first.group, self.group)
+        self.assertEqual(first.pub_date.year, 2020)
+        self.assertEqual(
+            list(first.tags.values_list('name', flat=True)), ['импорт']
+        )
+        comment = Comment.objects.get()
+        self.assertEqual(comment.post, first)
+        self.assertEqual(comment.author.username, 'new')
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_follows_invalidate(self):
+        """Импорт подписок сбрасывает кэш и рекомендации"""
+        reader = User.objects.create_user(username='reader')
+        FollowSuggestion.objects.create(user=reader, authors='')
+        self.assertFalse(is_following(reader, self.author))
+        self.import_records(
+            [{'type': 'follow', 'user': 'reader', 'author': 'author'}]
+        )
+        self.assertTrue(is_following(reader, self.author))
+        self.assertTrue(FollowSuggestion.objects.get(user=reader).stale)
+
+    def test_unknown_author_skipped(self):
+        """Без --create-users посты неизвестных авторов пропускаются"""
+        out = self.import_records([
+            {'type': 'post', 'author': 'ghost', 'text': 'Пост'},
+            {'type': 'post', 'text': 'Пост по умолчанию'},
+        ], '--author', 'author')
+        self.assertIn('skipped: 1', out)
+        self.assertEqual(Post.objects.get().author, self.author)
+
+    def test_keep_ids_requires_all(self):
+        """С --keep-ids пост без id останавливает импорт"""
+        with self.assertRaises(CommandError):
+            self.import_records([
+                {'type': 'post', 'id': 50, 'author': 'author', 'text': 'A'},
+                {'type': 'post', 'author': 'author', 'text': 'Без id'},
+            ], '--keep-ids')
+        self.assertFalse(Post.objects.exists())
+
+    def test_id_map(self):
+        """Соответствие id хранится в массивах и ищется бинарно"""
+        ids = IdMap()
+        for source, target in ((5, 50), (2, 20), (9, 90)):
+            ids.add(source, target)
+        self.assertEqual(
+            [ids.get(source) for source in (2, 5, 9, 7)], [20, 50, 90, None]
+        )
@@ -0,0 +1,157 @@
+import io
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import deletion, follows
+from ..deletion import schedule_deletion
+from ..models import (Comment, Follow, FollowSuggestion, Group,
+                      PendingDeletion, Post)
+from ..view_counts import view_counter
+
+User = get_user_model()
+
+
+class PurgeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        self.posts = [
+            Post.objects.create(
+                author=self.author, group=self.group, text='Пост @reader'
+            )
+            for _ in range(5)
+        ]
+        self.other = Post.objects.create(author=self.reader, text='Чужой')
+        for post in self.posts:
+            Comment.objects.create(
+                post=post, author=self.reader, text='Комментарий'
+            )
+        for _ in range(3):
+            Comment.objects.create(
+                post=self.other, author=self.author, text='Ответ'
+            )
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.author, author=self.reader)
+
+    def purge(self, *args):
+        call_command('purge', *args, '--batch', '2', stdout=io.StringIO())
+
+    def tearDown(self):
+        # Иначе буфер просмотров переживёт тестовую базу.
+        view_counter.pending.clear()
+
+    def test_user_hidden_immediately(self):
+        """Удаляемый пользователь сразу пропадает из лент и профиля"""
+        schedule_deletion(self.author)
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.is_active)
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.posts[0].pk])
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        page_obj = self.client.get(reverse('posts:index')).context['page_obj']
+        self.assertEqual([post.pk for post in page_obj], [self.other.pk])
+
+    def test_purge_user(self):
+        """Пользователь удаляется пачками вместе с зависимыми строками"""
+        self.purge('user', 'author')
+        self.assertFalse(User.objects.filter(username='author').exists())
+        self.assertEqual(list(Post.objects.all()), [self.other])
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(PendingDeletion.objects.exists())
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.comment_count, 0)
+
+    def test_purge_user_follows(self):
+        """Удаление подписок сбрасывает кеш и рекомендации читателей"""
+        self.assertTrue(follows.is_following(self.reader, self.author))
+        self.assertEqual(
+            follows.follower_counts([self.reader.pk]), {self.reader.pk: 1}
+        )
+        FollowSuggestion.objects.create(user=self.reader, authors='')
+        self.purge('user', 'author')
+        self.assertFalse(follows.is_following(self.reader, self.author))
+        self.assertEqual(
+            follows.follower_counts([self.reader.pk]), {self.reader.pk: 0}
+        )
+        self.assertTrue(FollowSuggestion.objects.get(user=self.reader).stale)
+
+    def test_purge_pending(self):
+        """Без аргументов команда доводит запланированные удаления"""
+        schedule_deletion(self.posts[0])
+        self.purge()
+        self.assertFalse(Post.objects.filter(pk=self.posts[0].pk).exists())
+        self.assertEqual(Comment.objects.count(), 7)
+        self.assertFalse(PendingDeletion.objects.exists())
+
+    def test_group_posts_stay_visible(self):
+        """Посты удаляемой группы остаются в ленте и на своих
+        страницах, скрыта только сама группа"""
+        schedule_deletion(self.group)
+        page_obj = self.client.get(reverse('posts:index')).context['page_obj']
+        self.assertIn(self.posts[0].pk, [post.pk for post in page_obj])
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.posts[0].pk])
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        response = self.client.get(
+            reverse('posts:group_list', args=[self.group.slug])
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_purge_group(self):
+        """Посты удаляемой группы остаются без группы"""
+        self.purge('group', 'test-slug')
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(Post.objects.count(), 6)
+        self.assertFalse(Post.objects.filter(group__isnull=False).exists())
+
+    def test_hidden_set_expires(self):
+        """Удаление из другого процесса видно после короткого TTL"""
+        with mock.patch.object(deletion, 'HIDDEN_CACHE_TIME', 0):
+            self.assertFalse(deletion.hidden()[PendingDeletion.POST])
+            # Запись сделана в обход forget_hidden, как другим процессом.
+            PendingDeletion.objects.create(
+                kind=PendingDeletion.POST, object_id=self.other.pk
+            )
+            self.assertEqual(
+                deletion.hidden()[PendingDeletion.POST], {self.other.pk}
+            )
+
+    def test_admin_schedules_user_deletion(self):
+        """Админка не удаляет пользователя сразу, а ставит в очередь"""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        url = reverse('admin:auth_user_delete', args=[self.author.pk])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('posts_post', sql)
+        self.assertContains(response, self.author.username)
+        self.client.post(url, {'post': 'yes'})
+        self.assertTrue(User.objects.filter(pk=self.author.pk).exists())
+        self.assertTrue(PendingDeletion.objects.filter(
+            kind=PendingDeletion.USER, object_id=self.author.pk
+        ).exists())
@@ -0,0 +1,82 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.models import Task
+from ..models import Follow, FollowSuggestion
+from ..suggestions import FollowGraph, drain_stale, suggestions_for
+
+User = get_user_model()
+
+
+class SuggestionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('ann', 'bob', 'cat', 'dan', 'eve')
+        }
+        for user, author in (('ann', 'bob'), ('ann', 'cat'),
+                             ('bob', 'dan'), ('cat', 'dan'),
+                             ('cat', 'eve'), ('dan', 'eve')):
+            Follow.objects.create(
+                user=self.users[user], author=self.users[author]
+            )
+        self.client = Client()
+        self.client.force_login(self.users['ann'])
+
+    def suggest(self, *args):
+        call_command('suggest_follows', *args, stdout=io.StringIO())
+
+    def names(self, user):
+        return [author.username for author in suggestions_for(user)]
+
+    def test_graph(self):
+        """CSR-граф хранит подписки и входящие степени"""
+        graph = FollowGraph.load()
+        self.assertEqual(
+            set(graph.following(self.users['ann'].pk)),
+            {self.users['bob'].pk, self.users['cat'].pk}
+        )
+        self.assertEqual(graph.in_degree[self.users['dan'].pk], 2)
+
+    def test_friends_of_friends(self):
+        """Рекомендации упорядочены по числу общих подписок"""
+        self.suggest()
+        self.assertEqual(self.names(self.users['ann']), ['dan', 'eve'])
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [user.username for user in response.context['suggestions']],
+            ['dan', 'eve']
+        )
+
+    def test_incremental(self):
+        """Повторный запуск трогает только изменившееся окружение"""
+        self.suggest()
+        self.client.get(reverse('posts:profile_follow', args=['dan']))
+        self.assertFalse(FollowSuggestion.objects.filter(stale=True).exists())
+        drain_stale()
+        stale = set(
+            FollowSuggestion.objects.filter(stale=True)
+            .values_list('user__username', flat=True)
+        )
+        self.assertEqual(stale, {'ann'})
+        out = io.StringIO()
+        call_command('suggest_follows', stdout=out)
+        self.assertIn('Обновлено рекомендаций: 1', out.getvalue())
+        self.assertEqual(self.names(self.users['ann']), ['eve'])
+
+    def test_worker_schedules(self):
+        """run_tasks пересчитывает рекомендации и ставит следующий
+        пересчёт на следующий интервал"""
+        call_command('run_tasks', '--once', stdout=io.StringIO())
+        self.assertEqual(self.names(self.users['ann']), ['dan', 'eve'])
+        tasks = Task.objects.filter(name='posts.suggest_follows')
+        self.assertEqual(
+            list(tasks.values_list('status', flat=True).order_by('run_at')),
+            [Task.DONE, Task.QUEUED]
+        )
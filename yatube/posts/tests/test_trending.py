@@ -0,0 +1,85 @@
+import io
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.models import Task
+from .. import trending
+from ..models import Post
+from ..tasks import rank_trending
+
+User = get_user_model()
+
+NOW = 1_700_000_000
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text='Пост %s' % i)
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_counters(self):
+        """Очки копятся по интервалам и сводятся в рейтинг"""
+        first, second, third = (post.pk for post in self.posts)
+        for _ in range(3):
+            trending.record(first, now=NOW)
+        trending.record(second, trending.COMMENT_WEIGHT, now=NOW)
+        trending.record(second, now=NOW)
+        self.assertEqual(
+            trending.bucket_scores(trending.current_bucket(NOW)),
+            {first: 3, second: 4}
+        )
+        self.assertEqual(trending.rank(now=NOW), [second, first])
+        self.assertEqual(trending.trending_ids(), [second, first])
+
+    def test_old_buckets_decay(self):
+        """Старые интервалы весят меньше и выпадают из окна"""
+        first, second = self.posts[0].pk, self.posts[1].pk
+        old = NOW - trending.BUCKET_SECONDS * (trending.WINDOW_BUCKETS - 1)
+        for _ in range(4):
+            trending.record(first, now=old)
+        trending.record(second, now=NOW)
+        self.assertEqual(trending.rank(now=NOW), [second, first])
+        later = NOW + trending.BUCKET_SECONDS * trending.WINDOW_BUCKETS
+        self.assertEqual(trending.rank(now=later), [])
+
+    def test_trending_page(self):
+        """Комментарии поднимают пост во вкладке трендов"""
+        post = self.posts[0]
+        self.client.post(
+            reverse('posts:add_comment', args=[post.pk]), {'text': 'Ого'}
+        )
+        trending.rank()
+        response = self.client.get(reverse('posts:trending'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+        self.assertTrue(response.context['trending'])
+
+    def test_worker_starts_ranking(self):
+        """Запуск run_tasks ставит первый пересчёт трендов"""
+        call_command('run_tasks', '--once', stdout=io.StringIO())
+        self.assertTrue(
+            Task.objects.filter(name='posts.rank_trending').exists()
+        )
+
+    def test_failed_ranking_schedules_next(self):
+        """Ошибка пересчёта не обрывает цепочку"""
+        with mock.patch.object(trending, 'rank', side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                rank_trending()
+        self.assertTrue(
+            Task.objects.filter(name='posts.rank_trending').exists()
+        )
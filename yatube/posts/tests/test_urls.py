@@ -6,6 +6,7 @@ from django.urls import reverse
 from django.core.cache import cache
 
 from ..models import Group, Post
+from ..view_counts import view_counter
 
 User = get_user_model()
 
@@ -31,6 +32,10 @@ class PostURLTests(TestCase):
     def setUp(self):
         cache.clear()
 
+    def tearDown(self):
+        # Иначе буфер просмотров переживёт тестовую базу.
+        view_counter.pending.clear()
+
     def test_urls_uses_correct_template(self):
         """URL-адрес использует соответствующий шаблон."""
         templates_pages_names = {
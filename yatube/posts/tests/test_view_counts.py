@@ -0,0 +1,92 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post
+from ..view_counts import ViewCounter, view_counter
+
+User = get_user_model()
+
+
+@override_settings(VIEW_COUNT_FLUSH_SECONDS=3600)
+class ViewCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text='Пост %s' % i)
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        view_counter.pending.clear()
+
+    def make_counter(self):
+        counter = ViewCounter()
+        self.addCleanup(counter.stopped.set)
+        return counter
+
+    def tearDown(self):
+        # Иначе буфер просмотров переживёт тестовую базу.
+        view_counter.pending.clear()
+
+    def test_flush_groups_by_delta(self):
+        """Просмотры пишутся одним UPDATE на каждое приращение"""
+        counter = self.make_counter()
+        first, second, third = (post.pk for post in self.posts)
+        with self.assertNumQueries(0):
+            for pk in (first, first, second, second, third):
+                counter.hit(pk)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(counter.flush(), 3)
+        updates = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE')
+        ]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(
+            dict(Post.objects.values_list('pk', 'view_count')),
+            {first: 2, second: 2, third: 1}
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(counter.flush(), 0)
+
+    @override_settings(VIEW_COUNT_MAX_PENDING=2)
+    def test_flush_when_full(self):
+        """Буфер сбрасывается, когда в нём слишком много постов"""
+        counter = self.make_counter()
+        counter.hit(self.posts[0].pk)
+        counter.hit(self.posts[1].pk)
+        self.assertEqual(counter.pending_for(self.posts[0].pk), 0)
+        self.posts[0].refresh_from_db()
+        self.assertEqual(self.posts[0].view_count, 1)
+
+    def test_detail_shows_views(self):
+        """Страница поста показывает просмотры вместе с буфером"""
+        post = self.posts[0]
+        url = reverse('posts:post_detail', args=[post.pk])
+        Client().get(url)
+        response = Client().get(url)
+        self.assertEqual(response.context['post'].view_count, 2)
+        self.assertContains(response, 'Просмотров: 2')
+
+    def test_flush_by_timer(self):
+        """Фоновый поток сбрасывает просмотры без новых хитов"""
+        counter = self.make_counter()
+        counter.serving = True
+        flushed = threading.Event()
+
+        def flush():
+            if threading.current_thread().name == 'view-counter':
+                flushed.set()
+
+        with override_settings(VIEW_COUNT_FLUSH_SECONDS=0.01), \
+                mock.patch.object(counter, 'flush', side_effect=flush):
+            counter.hit(self.posts[0].pk)
+            self.assertTrue(flushed.wait(5))
@@ -10,6 +10,7 @@ from django.urls import reverse
 from django.core.cache import cache
 
 from ..models import Follow, Post, Group, Comment
+from ..view_counts import view_counter
 from ..views import NUM_OF_PAGE
 
 User = get_user_model()
@@ -58,6 +59,10 @@ class PostViewTests(TestCase):
         self.authorized_client.force_login(self.test_author)
         cache.clear()
 
+    def tearDown(self):
+        # Иначе буфер просмотров переживёт тестовую базу.
+        view_counter.pending.clear()
+
     def test_post_edit_author(self):
         """Проверил что успешно авторизировался"""
         responce = self.authorized_client.get(
@@ -0,0 +1,92 @@
+import heapq
+import time
+
+from django.core.cache import cache
+
+from core.tasks import enqueue
+
+BUCKET_SECONDS = 300
+WINDOW_BUCKETS = 12
+TRENDING_SIZE = 100
+COMMENT_WEIGHT = 3
+VIEW_WEIGHT = 1
+TOP_KEY = 'trending:top'
+
+
+def current_bucket(now=None):
+    return int(now or time.time()) // BUCKET_SECONDS
+
+
+def score_key(bucket, post_id):
+    return 'trending:{}:{}'.format(bucket, post_id)
+
+
+def size_key(bucket):
+    return 'trending:{}:n'.format(bucket)
+
+
+def slot_key(bucket, slot):
+    return 'trending:{}:slot:{}'.format(bucket, slot)
+
+
+def record(post_id, weight=VIEW_WEIGHT, now=None):
+    """Прибавляет посту очки в текущем интервале.
+
+    Только incr/add кэша: счётчики не теряются при параллельных
+    запросах. Первое касание поста в интервале занимает слот, по
+    которому rank_trending потом находит пост без перебора ключей.
+    """
+    bucket = current_bucket(now)
+    ttl = BUCKET_SECONDS * (WINDOW_BUCKETS + 1)
+    key = score_key(bucket, post_id)
+    if not cache.add(key, weight, ttl):
+        try:
+            cache.incr(key, weight)
+            return
+        except ValueError:
+            cache.set(key, weight, ttl)
+    cache.add(size_key(bucket), 0, ttl)
+    cache.set(slot_key(bucket, cache.incr(size_key(bucket))), post_id, ttl)
+
+
+def bucket_scores(bucket):
+    size = cache.get(size_key(bucket)) or 0
+    slots = cache.get_many(
+        [slot_key(bucket, slot) for slot in range(1, size + 1)]
+    )
+    post_ids = set(slots.values())
+    scores = cache.get_many([score_key(bucket, pk) for pk in post_ids])
+    return {
+        pk: scores[score_key(bucket, pk)]
+        for pk in post_ids if score_key(bucket, pk) in scores
+    }
+
+
+def rank(size=TRENDING_SIZE, now=None):
+    """Сводит интервалы окна в рейтинг. Свежие интервалы весят
+    больше, поэтому пост постепенно выпадает из тренда."""
+    last = current_bucket(now)
+    totals = {}
+    for age in range(WINDOW_BUCKETS):
+        weight = (WINDOW_BUCKETS - age) / WINDOW_BUCKETS
+        for pk, score in bucket_scores(last - age).items():
+            totals[pk] = totals.get(pk, 0) + score * weight
+    top = heapq.nlargest(size, totals, key=lambda pk: (totals[pk], pk))
+    cache.set(TOP_KEY, top, None)
+    return top
+
+
+def trending_ids():
+    return cache.get(TOP_KEY) or []
+
+
+def schedule_ranking(now=None):
+    """Ставит пересчёт на начало следующего интервала; ключ
+    задачи не даёт запланировать один интервал дважды."""
+    now = now or time.time()
+    bucket = current_bucket(now) + 1
+    return enqueue(
+        'posts.rank_trending',
+        key='trending:{}'.format(bucket),
+        delay=bucket * BUCKET_SECONDS - now,
+    )
@@ -1,14 +1,36 @@
 from django.urls import path
 
-from . import views
+from . import api, feeds, views
 
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('rss/', feeds.index_rss, name='index_rss'),
+    path('atom/', feeds.index_atom, name='index_atom'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('group/<slug:slug>/rss/', feeds.group_rss, name='group_rss'),
+    path('group/<slug:slug>/atom/', feeds.group_atom, name='group_atom'),
+    path('tags/<str:name>/', views.tag_posts, name='tag_posts'),
+    path('mentions/', views.mentions, name='mentions'),
+    path('trending/', views.trending_posts, name='trending'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/rss/',
+        feeds.author_rss,
+        name='author_rss'
+    ),
+    path(
+        'profile/<str:username>/atom/',
+        feeds.author_atom,
+        name='author_atom'
+    ),
+    path(
+        'profile/<str:username>/export/',
+        views.profile_export,
+        name='profile_export'
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
@@ -17,6 +39,11 @@ urlpatterns = [
         views.add_comment,
         name='add_comment'
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path('follow/', views.follow_index, name='follow_index'),
     path(
         'profile/<str:username>/follow/',
@@ -28,4 +55,24 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    path('api/posts/', api.api_index, name='api_index'),
+    path('api/posts/batch/', api.api_posts_batch, name='api_posts_batch'),
+    path('api/posts/<int:post_id>/', api.api_post, name='api_post'),
+    path('api/group/<slug:slug>/', api.api_group, name='api_group'),
+    path(
+        'api/profile/<str:username>/',
+        api.api_profile,
+        name='api_profile'
+    ),
+    path(
+        'api/profile/<str:username>/follow/',
+        api.api_profile_follow,
+        name='api_profile_follow'
+    ),
+    path(
+        'api/profile/<str:username>/unfollow/',
+        api.api_profile_unfollow,
+        name='api_profile_unfollow'
+    ),
+    path('api/follow/', api.api_follow, name='api_follow'),
 ]
@@ -0,0 +1,114 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import Post
+
+FLUSH_SECONDS = 10
+MAX_PENDING = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def flush_seconds():
+    return getattr(settings, 'VIEW_COUNT_FLUSH_SECONDS', FLUSH_SECONDS)
+
+
+class ViewCounter:
+    """Просмотры постов, накопленные в процессе.
+
+    В базу уходят одним UPDATE на каждое встретившееся приращение не
+    реже раза в VIEW_COUNT_FLUSH_SECONDS: сбрасывает фоновый поток,
+    даже если новых просмотров нет. При падении воркера теряются
+    просмотры только за этот интервал.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.last_flush = time.monotonic()
+        self.flusher_pid = None
+        self.stopped = threading.Event()
+        self.serving = False
+
+    def serve(self):
+        """Включает фоновый сброс и сброс при выходе. Вызывается из
+        wsgi.py: в тестах и командах буфер сам в базу не уходит."""
+        self.serving = True
+        atexit.register(self.flush_at_exit)
+
+    def hit(self, post_id):
+        if self.serving and self.flusher_pid != os.getpid():
+            self.start_flusher()
+        with self.lock:
+            self.pending[post_id] += 1
+            due = (
+                len(self.pending) >= getattr(
+                    settings, 'VIEW_COUNT_MAX_PENDING', MAX_PENDING)
+                or time.monotonic() - self.last_flush >= flush_seconds()
+            )
+        if due:
+            self.flush()
+
+    def start_flusher(self):
+        # Поток запускается в каждом процессе: после fork потоков
+        # родителя в воркере нет.
+        with self.lock:
+            if self.flusher_pid == os.getpid():
+                return
+            self.flusher_pid = os.getpid()
+        threading.Thread(
+            target=self.run_flusher, name='view-counter', daemon=True
+        ).start()
+
+    def run_flusher(self):
+        while not self.stopped.wait(flush_seconds()):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Не удалось сохранить просмотры')
+            finally:
+                connection.close()
+
+    def flush_at_exit(self):
+        # При остановке повторить запись уже негде: если база недоступна,
+        # теряем только последний интервал.
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+    def pending_for(self, post_id):
+        with self.lock:
+            return self.pending.get(post_id, 0)
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+            self.last_flush = time.monotonic()
+        if not pending:
+            return 0
+        by_delta = defaultdict(list)
+        for post_id, delta in pending.items():
+            by_delta[delta].append(post_id)
+        try:
+            with transaction.atomic():
+                for delta, ids in by_delta.items():
+                    Post.objects.filter(pk__in=ids).update(
+                        view_count=F('view_count') + delta
+                    )
+        except Exception:
+            with self.lock:
+                self.pending.update(pending)
+            raise
+        return len(pending)
+
+
+view_counter = ViewCounter()
@@ -1,10 +1,23 @@
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.decorators.cache import cache_page
 
-from .models import Post, Group, User, Follow
+from core.coalescing import on_coalesced
+from core.ratelimit import rate_limit
+
+from .models import ArchivedPost, Post, Group, User, Tag
 from .forms import PostForm, CommentForm
+from .archive import ArchiveFallbackList
+from .comments import comment_page
+from .deletion import check_post_visible, check_visible, visible
+from .follows import (follow, follower_counts, following_query, is_following,
+                      unfollow)
+from .suggestions import suggestions_for
+from . import trending
+from .view_counts import view_counter
+from .export import FORMATS, export_lines
 
 
 NUM_OF_PAGE = 10
@@ -21,7 +34,10 @@ def paginate(posts, request):
 @cache_page(CACHE_TIME, key_prefix='index_page')
 def index(request):
     template = 'posts/index.html'
-    posts = Post.objects.all()
+    posts = ArchiveFallbackList(
+        visible(Post.objects.all()), visible(ArchivedPost.objects.all()),
+        'all'
+    )
     context = {
         'page_obj': paginate(posts, request),
     }
@@ -31,7 +47,11 @@ def index(request):
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    check_visible(group)
+    posts = ArchiveFallbackList(
+        visible(group.posts.all()), visible(group.archived_posts.all()),
+        'group:{}'.format(group.pk)
+    )
     context = {
         'group': group,
         'page_obj': paginate(posts, request),
@@ -39,37 +59,130 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+def tag_posts(request, name):
+    template = 'posts/tag_list.html'
+    tag = get_object_or_404(Tag, name=name.lower())
+    posts = visible(tag.posts.select_related('author', 'group'))
+    context = {
+        'tag': tag,
+        'page_obj': paginate(posts, request),
+    }
+    return render(request, template, context)
+
+
+def trending_posts(request):
+    template = 'posts/trending.html'
+    ids = trending.trending_ids()
+    found = visible(Post.objects.filter(pk__in=ids)).select_related(
+        'author', 'group'
+    ).in_bulk()
+    posts = [found[pk] for pk in ids if pk in found]
+    context = {
+        'page_obj': paginate(posts, request),
+        'trending': True,
+    }
+    return render(request, template, context)
+
+
+@login_required
+def mentions(request):
+    template = 'posts/mentions.html'
+    posts = visible(
+        request.user.mentioned_in.select_related('author', 'group')
+    )
+    context = {
+        'page_obj': paginate(posts, request),
+    }
+    return render(request, template, context)
+
+
 def profile(request, username):
     template = 'posts/profile.html'
     author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    following = (request.user.is_authenticated
-                 and Follow.objects.filter(
-                     user=request.user,
-                     author=author).exists()
-                 )
+    check_visible(author)
+    posts = visible(author.posts.all())
+    following = is_following(request.user, author)
     context = {
         'posts': posts,
         'author': author,
-        'page_obj': paginate(posts, request),
-        'following': following
+        'page_obj': paginate(ArchiveFallbackList(
+            posts, visible(author.archived_posts.all()),
+            'author:{}'.format(author.pk)
+        ), request),
+        'following': following,
+        'followers': follower_counts([author.pk])[author.pk],
+        'suggestions': (
+            suggestions_for(author) if author == request.user else []
+        ),
     }
     return render(request, template, context)
 
 
+@login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        return redirect('posts:profile', username)
+    fmt = request.GET.get('format')
+    if fmt not in FORMATS:
+        fmt = 'jsonl'
+    response = StreamingHttpResponse(
+        export_lines(author, fmt),
+        content_type=FORMATS[fmt]
+    )
+    response['Content-Disposition'] = (
+        'attachment; filename="{}.{}"'.format(author.username, fmt)
+    )
+    return response
+
+
+def get_post_or_archived(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    archived = post is None
+    if archived:
+        post = get_object_or_404(ArchivedPost, pk=post_id)
+    check_post_visible(post)
+    return post, archived
+
+
+def record_view(request, post_id):
+    trending.record(post_id)
+    view_counter.hit(post_id)
+
+
+# Склеенные запросы не вызывают view, но просмотр всё равно засчитан.
+@on_coalesced(record_view)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.select_related('author')
+    post, archived = get_post_or_archived(post_id)
+    if not archived:
+        record_view(request, post.pk)
+        post.view_count += view_counter.pending_for(post.pk)
+    comments, next_cursor = comment_page(post, request.GET.get('after'))
     form = CommentForm(request.POST or None)
     context = {
         'post': post,
         'form': form,
-        'comments': comments
+        'comments': comments,
+        'next_cursor': next_cursor,
+        'archived': archived,
     }
     return render(request, template, context)
 
 
+def post_comments(request, post_id):
+    """Следующая страница комментариев HTML-фрагментом."""
+    post, _ = get_post_or_archived(post_id)
+    comments, next_cursor = comment_page(post, request.GET.get('after'))
+    context = {
+        'post': post,
+        'comments': comments,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+@rate_limit(user='10/m', ip='30/m')
 @login_required
 def post_create(request):
     form = PostForm(
@@ -87,6 +200,7 @@ def post_create(request):
     return render(request, 'posts/create_post.html', context)
 
 
+@rate_limit(user='20/m', ip='60/m')
 @login_required
 def post_edit(request, post_id):
     post_id = get_object_or_404(Post, pk=post_id)
@@ -107,6 +221,7 @@ def post_edit(request, post_id):
     return render(request, 'posts/create_post.html', context)
 
 
+@rate_limit(user='20/m', ip='60/m')
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
@@ -116,18 +231,25 @@ def add_comment(request, post_id):
         comment.author = request.user
         comment.post = post
         comment.save()
+        trending.record(post.pk, trending.COMMENT_WEIGHT)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
+    authors = following_query(request.user)
+    posts = ArchiveFallbackList(
+        visible(Post.objects.filter(author_id__in=authors)),
+        visible(ArchivedPost.objects.filter(author_id__in=authors)),
+        None
+    )
     paginate = Paginator(posts, NUM_OF_PAGE)
     page_number = request.GET.get('page')
     page_obj = paginate.get_page(page_number)
     context = {
         'page_obj': page_obj,
-        'follow': True
+        'follow': True,
+        'suggestions': suggestions_for(request.user),
     }
     return render(request, 'posts/follow.html', context)
 
@@ -135,20 +257,12 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    user = request.user
-    if author != user:
-        Follow.objects.get_or_create(user=user, author=author)
-        return redirect('posts:profile', request.user.username)
-    return redirect('posts:profile', request.user.username)
+    follow(request.user, author)
+    return redirect('posts:profile', username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    user = request.user
-    follow_for_delete = Follow.objects.filter(
-        user=user,
-        author=author
-    )
-    follow_for_delete.delete()
-    return render(request, 'posts/index.html')
+    unfollow(request.user, author)
+    return redirect('posts:profile', username)
@@ -1,5 +1,8 @@
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
 from django.contrib.auth import get_user_model
+from django.template import loader
+
+from core.tasks import enqueue
 
 
 User = get_user_model()
@@ -9,3 +12,20 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """Письмо со ссылкой сброса уходит через очередь задач:
+    запрос не ждёт SMTP, а сбой почты повторит воркер."""
+
+    def send_mail(self, subject_template_name, email_template_name,
+                  context, from_email, to_email,
+                  html_email_template_name=None):
+        subject = loader.render_to_string(subject_template_name, context)
+        enqueue('core.send_mail', {
+            'subject': ''.join(subject.splitlines()),
+            'message': loader.render_to_string(
+                email_template_name, context),
+            'recipient_list': [to_email],
+            'from_email': from_email,
+        })
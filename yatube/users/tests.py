@@ -0,0 +1,31 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import Task
+from core.tasks import run_pending
+
+User = get_user_model()
+
+
+class PasswordResetTests(TestCase):
+    def test_mail_queued(self):
+        """Письмо сброса пароля ставится в очередь и уходит воркером"""
+        User.objects.create_user(
+            username='user', email='user@example.com', password='secret'
+        )
+        response = self.client.post(
+            reverse('users:password_reset'), {'email': 'user@example.com'}
+        )
+        self.assertRedirects(response, reverse('password_reset_done'))
+        self.assertEqual(mail.outbox, [])
+        task = Task.objects.get(name='core.send_mail')
+        self.assertEqual(
+            json.loads(task.payload)['recipient_list'], ['user@example.com']
+        )
+        run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('/auth/reset/', mail.outbox[0].body)
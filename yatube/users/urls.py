@@ -1,7 +1,9 @@
-from django.contrib.auth.views import LogoutView, LoginView
-from django.urls import path
+from django.contrib.auth.views import (LogoutView, LoginView,
+                                       PasswordResetView)
+from django.urls import path, reverse_lazy
 
 from . import views
+from .forms import QueuedPasswordResetForm
 
 app_name = 'users'
 
@@ -17,4 +19,13 @@ urlpatterns = [
         LoginView.as_view(template_name='users/login.html'),
         name='login'
     ),
+    # Перекрывает одноимённый путь django.contrib.auth.urls.
+    path(
+        'password_reset/',
+        PasswordResetView.as_view(
+            form_class=QueuedPasswordResetForm,
+            success_url=reverse_lazy('password_reset_done')
+        ),
+        name='password_reset'
+    ),
 ]
@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -50,11 +52,18 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.server_timing.ServerTimingMiddleware',
+    'core.middleware.slow_queries.SlowQueryMiddleware',
+    'core.middleware.replicas.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'core.middleware.ratelimit.RateLimitMiddleware',
+    'core.middleware.coalescing.CoalescingMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.profiling.ProfilingMiddleware',
+    'core.middleware.memory.MemoryProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,7 +73,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -87,11 +96,48 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': 5000,
+                'cache_size': -20000,
+                'mmap_size': 268435456,
+            },
+        },
     }
 }
 
+# Реплика только для чтения, например копия db.sqlite3 или Postgres.
+DATABASE_REPLICAS = []
+if os.getenv('REPLICA_DB_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('REPLICA_DB_NAME'),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS = ['replica']
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = 10
+REPLICA_READ_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+    'posts:tag_posts',
+    'posts:api_index',
+    'posts:api_group',
+    'posts:api_profile',
+    'posts:api_follow',
+    'posts:api_post',
+    'posts:api_posts_batch',
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -139,8 +185,72 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Кэш общий для всех воркеров: на нём держатся счётчики трендов,
+# лимиты запросов, сессии и версии архива. Без memcached - файлы.
+# Тесты чистят кэш: он не должен совпадать с кэшем запущенного сайта.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
+MEMCACHED_LOCATION = os.getenv('MEMCACHED_LOCATION')
+if MEMCACHED_LOCATION and not TESTING:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.backends.MemcachedCache',
+            'LOCATION': MEMCACHED_LOCATION.split(','),
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.backends.FileBasedCache',
+            'LOCATION': (
+                os.path.join(tempfile.gettempdir(), 'yatube-test-cache')
+                if TESTING else
+                os.getenv('CACHE_DIR', os.path.join(BASE_DIR, 'cache'))
+            ),
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+
+TASKS_ALWAYS_EAGER = False
+
+SERVER_TIMING_HEADER = True
+# Общая папка, через которую воркеры складывают метрики для /metrics.
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG')
+# 0 - профилируются только запросы сотрудников с заголовком X-Profile.
+PROFILING_SAMPLE_RATE = 0
+PROFILING_MODE = 'sampling'
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+MEMORY_PROFILING_SAMPLE_RATE = 0
+MEMORY_PROFILING_LOG = os.path.join(BASE_DIR, 'memory_profile.jsonl')
+THUMBNAIL_BACKEND = 'core.backends.ThumbnailBackend'
+# Посты старше этого срока archive_posts переносит в архивные таблицы.
+ARCHIVE_AFTER_DAYS = 365
+# Просмотры постов копятся в процессе и сбрасываются в базу пачкой.
+VIEW_COUNT_FLUSH_SECONDS = 10
+VIEW_COUNT_MAX_PENDING = 1000
+# Переопределение лимитов записи по имени view, например
+# {'posts:add_comment': {'user': '5/m', 'ip': '20/m'}}.
+RATE_LIMITS = {}
+# Одновременные анонимные GET к этим view выполняются один раз.
+COALESCE_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+)
+COALESCE_TIMEOUT = 5
+COALESCE_ACROSS_WORKERS = False
+# Сессии и пользователь сессии читаются из кэша, запись в базу сразу.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CLEANUP_SECONDS = 24 * 3600
+# Как часто воркер пересчитывает рекомендации подписок.
+SUGGESTIONS_SECONDS = 3600
+AUTHENTICATION_BACKENDS = [
+    'core.auth.CachedModelBackend',
+    # Сессии, открытые до перехода на кэш, остаются действительными.
+    'django.contrib.auth.backends.ModelBackend',
+]
+AUTH_USER_CACHE_TIME = 300
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Только обслуживающий запросы процесс сам сбрасывает просмотры в базу.
+from posts.view_counts import view_counter  # noqa: E402
+
+view_counter.serve()